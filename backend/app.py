@@ -1,26 +1,90 @@
-from flask import request, jsonify, Flask, make_response
-from datetime import datetime
+from flask import request, jsonify, Flask, make_response, g, Response, has_request_context
+from datetime import datetime, date, timedelta
 from dotenv import load_dotenv
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import select, insert, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, load_only
 from flask_cors import CORS
-from werkzeug.security import generate_password_hash, check_password_hash
 import jwt
 import os, time, uuid
-import requests
+import itertools
+import threading
+import re
+import logging
+from collections import Counter, defaultdict
+import click
+
+from exercise_cache import ExerciseCache, normalize_key, key_params
+from exercise_provider import ExerciseProviderClient, MUSCLES, EXERCISE_TYPES
+import streaks
+import migrations
+import sqlite_tuning
+import db_config
+from auth import VerifiedTokenCache, extract_token, verify_token
+from logging_config import setup_logging, parse_levels, AccessLogSampler
+from metrics import Registry
+from password_hashing import PasswordHasher, HasherBusy
+from refresh_tokens import create_store
+from suggest_index import PrefixIndex
+from responses import FastJSONProvider, compress_response, parse_fields, select_fields
 
 
-print(jwt.__file__)
-print(jwt.__version__)
-
 load_dotenv()
 
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.environ.get("LOG_LEVELS", "werkzeug=WARNING")  # z.B. "app=DEBUG,exercise_cache=WARNING"
+ACCESS_LOG_SAMPLE_RATE = float(os.environ.get("ACCESS_LOG_SAMPLE_RATE", 0.1))
+
+setup_logging(LOG_LEVEL, parse_levels(LOG_LEVELS))
+logger = logging.getLogger("app")
+access_logger = logging.getLogger("app.access")
+access_log_sampler = AccessLogSampler(ACCESS_LOG_SAMPLE_RATE)
+
 JWT_SECRET = os.environ.get("JWT_SECRET", "serious-app-serious-saturday")
 JWT_ISSUER = "serious-saturday-api"
 ACCESS_TTL = 15 * 60 * 60  # 15 minutes
 REFRESH_TTL = 14 * 24 * 3600  # 14 days
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get("AUTH_TOKEN_CACHE_SIZE", 4096))
 API_NINJAS_KEY = os.environ.get("API_NINJAS_KEY", "KFh/eSdyskwnqd89xJJxsw==Jx3kGhfznAFGLGgm")
-print(JWT_SECRET)
+EXERCISE_CACHE_TTL = int(os.environ.get("EXERCISE_CACHE_TTL", 6 * 3600))  # 6 Stunden frisch
+EXERCISE_CACHE_STALE_TTL = int(os.environ.get("EXERCISE_CACHE_STALE_TTL", 7 * 24 * 3600))  # danach 7 Tage stale
+EXERCISE_CACHE_SIZE = int(os.environ.get("EXERCISE_CACHE_SIZE", 512))
+API_NINJAS_TIMEOUT = float(os.environ.get("API_NINJAS_TIMEOUT", 10))
+API_NINJAS_RETRIES = int(os.environ.get("API_NINJAS_RETRIES", 3))
+API_NINJAS_MAX_CONCURRENCY = int(os.environ.get("API_NINJAS_MAX_CONCURRENCY", 8))
+API_NINJAS_DEADLINE = float(os.environ.get("API_NINJAS_DEADLINE", 15))  # Sekunden über alle Retries
+ASGI_WSGI_THREADS = int(os.environ.get("ASGI_WSGI_THREADS", 16))  # Threads für die synchronen Routen unter asgi.py
+REFRESH_TOKEN_STORE = os.environ.get("REFRESH_TOKEN_STORE", "sqlite")  # "sqlite" oder "memory"
+REFRESH_TOKEN_SWEEP_INTERVAL = int(os.environ.get("REFRESH_TOKEN_SWEEP_INTERVAL", 300))
+REFRESH_TOKEN_SWEEP_BATCH = int(os.environ.get("REFRESH_TOKEN_SWEEP_BATCH", 1000))
+DATABASE_URL = db_config.database_uri(os.environ.get("DATABASE_URL"))
+DATABASE_READ_URL = os.environ.get("DATABASE_READ_URL")  # z.B. Postgres-Replica für GET-Routen
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "1") == "1"
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))  # Sekunden
+SQLITE_PROFILE = os.environ.get("SQLITE_PROFILE", "production")  # "production" = WAL & Co., "default" = SQLite-Standard
+SQLITE_BUSY_TIMEOUT = os.environ.get("SQLITE_BUSY_TIMEOUT")  # ms, überschreibt das Profil
+SQLITE_MMAP_SIZE = os.environ.get("SQLITE_MMAP_SIZE")
+SQLITE_CACHE_SIZE = os.environ.get("SQLITE_CACHE_SIZE")
+SQLITE_READ_ENGINE = os.environ.get("SQLITE_READ_ENGINE", "0") == "1"  # eigene Read-only-Engine für GET-Routen
+SUGGEST_INDEX_MAX_AGE = int(os.environ.get("SUGGEST_INDEX_MAX_AGE", 300))  # Sekunden, gleicht andere Worker ab
+SUGGEST_INDEX_PRELOAD = os.environ.get("SUGGEST_INDEX_PRELOAD", "1") == "1"  # Index beim Start im Hintergrund bauen
+PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "pbkdf2:sha256")
+PASSWORD_SALT_LENGTH = int(os.environ.get("PASSWORD_SALT_LENGTH", 16))
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))  # 0 = im Request-Thread
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 16))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.environ.get("PASSWORD_HASH_QUEUE_TIMEOUT", 1.0))
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))  # Bytes, kleinere Antworten bleiben unkomprimiert
+COMPRESS_GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", 6))
+COMPRESS_BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", 5))
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(
     app,
     resources={
@@ -30,8 +94,159 @@ CORS(
     allow_headers=["Authorization", "Content-Type"],
 )
 
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///profiles.db"
+app.config["SQLALCHEMY_DATABASE_URI"] = DATABASE_URL
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = db_config.engine_options(
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_PRE_PING, DB_POOL_RECYCLE)
+if DATABASE_READ_URL:
+    app.config["SQLALCHEMY_BINDS"] = {"read": db_config.database_uri(DATABASE_READ_URL)}
+elif SQLITE_READ_ENGINE and db_config.is_sqlite(DATABASE_URL):
+    app.config["SQLALCHEMY_BINDS"] = {"read": sqlite_tuning.read_only_uri(DATABASE_URL, app.instance_path)}
+sqlite_pragmas = sqlite_tuning.profile_pragmas(
+    SQLITE_PROFILE,
+    busy_timeout=SQLITE_BUSY_TIMEOUT,
+    mmap_size=SQLITE_MMAP_SIZE,
+    cache_size=SQLITE_CACHE_SIZE,
+)
+
+token_cache = VerifiedTokenCache(max_entries=AUTH_TOKEN_CACHE_SIZE)
+
+refresh_tokens = create_store(
+    REFRESH_TOKEN_STORE,
+    os.environ.get("REFRESH_TOKEN_STORE_PATH", os.path.join(app.instance_path, "refresh_tokens.db")),
+)
+refresh_tokens.start_sweeper(REFRESH_TOKEN_SWEEP_INTERVAL, REFRESH_TOKEN_SWEEP_BATCH)
+
+
+metrics_registry = Registry()
+http_requests_total = metrics_registry.counter(
+    'http_requests_total', 'HTTP-Requests nach Route und Status', ('method', 'route', 'status'))
+http_request_duration = metrics_registry.histogram(
+    'http_request_duration_seconds', 'Dauer der HTTP-Requests', ('method', 'route'))
+http_requests_in_flight = metrics_registry.gauge(
+    'http_requests_in_flight', 'Gerade laufende HTTP-Requests')
+db_statements_total = metrics_registry.counter(
+    'db_statements_total', 'SQL-Statements nach Route', ('route',))
+db_statement_seconds_total = metrics_registry.counter(
+    'db_statement_seconds_total', 'Zeit in SQL-Statements nach Route', ('route',))
+db_statements_per_request = metrics_registry.histogram(
+    'db_statements_per_request', 'SQL-Statements pro Request', ('route',),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100))
+upstream_requests_total = metrics_registry.counter(
+    'upstream_requests_total', 'Aufrufe bei API Ninjas nach Ergebnis', ('provider', 'outcome'))
+upstream_errors_total = metrics_registry.counter(
+    'upstream_errors_total', 'Fehlgeschlagene Aufrufe bei API Ninjas', ('provider',))
+upstream_request_duration = metrics_registry.histogram(
+    'upstream_request_duration_seconds', 'Dauer der Aufrufe bei API Ninjas', ('provider',))
+password_hash_pending = metrics_registry.gauge(
+    'password_hash_pending', 'Laufende und wartende Hash-Aufträge')
+password_hash_rejected_total = metrics_registry.counter(
+    'password_hash_rejected_total', 'Wegen voller Warteschlange abgelehnte Hash-Aufträge')
+
+
+def _route_label():
+    # Regel statt Pfad, damit /streaks/<id> nicht pro ID eine Zeitreihe erzeugt
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+def observe_provider_call(seconds, outcome):
+    upstream_requests_total.inc(provider='api_ninjas', outcome=outcome)
+    upstream_request_duration.observe(seconds, provider='api_ninjas')
+    if outcome != '200':
+        upstream_errors_total.inc(provider='api_ninjas')
+
+
+def observe_password_hashing(event):
+    if event == 'queued':
+        password_hash_pending.inc()
+    elif event == 'done':
+        password_hash_pending.dec()
+    else:
+        password_hash_rejected_total.inc()
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+    g.sql_statements = 0
+    g.sql_seconds = 0.0
+    g.in_flight = True
+    http_requests_in_flight.inc()
+
+
+@app.after_request
+def _finish_request(response):
+    elapsed = time.perf_counter() - g.get('request_started', time.perf_counter())
+    route = _route_label()
+
+    http_requests_total.inc(method=request.method, route=route, status=str(response.status_code))
+    http_request_duration.observe(elapsed, method=request.method, route=route)
+    sql_statements = g.get('sql_statements', 0)
+    db_statements_per_request.observe(sql_statements, route=route)
+    if sql_statements:
+        db_statements_total.inc(sql_statements, route=route)
+        db_statement_seconds_total.inc(g.sql_seconds, route=route)
+
+    if access_log_sampler.should_log(response.status_code):
+        access_logger.info("%s %s %s %.1fms %d sql", request.method, request.path,
+                           response.status_code, elapsed * 1000, sql_statements)
+    return response
+
+
+# Nach _finish_request registriert und damit vorher ausgeführt - die Kompression zählt zur Request-Dauer
+@app.after_request
+def _compress_response(response):
+    return compress_response(response, request.accept_encodings, COMPRESS_MIN_SIZE,
+                             COMPRESS_GZIP_LEVEL, COMPRESS_BROTLI_QUALITY)
+
+
+@app.teardown_request
+def _end_request(exc):
+    if g.pop('in_flight', False):
+        http_requests_in_flight.dec()
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus-Metriken im Textformat"""
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+exercise_cache = ExerciseCache(
+    os.environ.get("EXERCISE_CACHE_PATH", os.path.join(app.instance_path, "exercise_cache.db")),
+    ttl=EXERCISE_CACHE_TTL,
+    stale_ttl=EXERCISE_CACHE_STALE_TTL,
+    max_entries=EXERCISE_CACHE_SIZE,
+)
+
+password_hasher = PasswordHasher(
+    PASSWORD_HASH_METHOD,
+    salt_length=PASSWORD_SALT_LENGTH,
+    workers=PASSWORD_HASH_WORKERS,
+    max_pending=PASSWORD_HASH_MAX_PENDING,
+    queue_timeout=PASSWORD_HASH_QUEUE_TIMEOUT,
+    observer=observe_password_hashing,
+)
+
+
+@app.errorhandler(HasherBusy)
+def _password_hashing_busy(e):
+    # Backpressure: Client soll es gleich nochmal versuchen, Worker bleiben frei
+    resp = jsonify({"error": "Zu viele Anmeldungen gleichzeitig, bitte gleich erneut versuchen"})
+    resp.status_code = 503
+    resp.headers["Retry-After"] = "1"
+    return resp
+
+
+exercise_provider = ExerciseProviderClient(
+    API_NINJAS_KEY,
+    timeout=API_NINJAS_TIMEOUT,
+    deadline=API_NINJAS_DEADLINE,
+    max_retries=API_NINJAS_RETRIES,
+    max_concurrency=API_NINJAS_MAX_CONCURRENCY,
+    pool_size=API_NINJAS_MAX_CONCURRENCY,
+    observer=observe_provider_call,
+)
 
 
 def create_jwt(sub: str, kind: str, ttl: int):
@@ -45,7 +260,6 @@ def create_jwt(sub: str, kind: str, ttl: int):
         "jti": jti,
         "typ": kind,
     }
-    print(payload)
     token = jwt.encode(payload, JWT_SECRET, algorithm="HS256")
     return token, payload
 
@@ -53,55 +267,106 @@ def create_jwt(sub: str, kind: str, ttl: int):
 from functools import wraps
 
 
+def _authenticate(token):
+    """Prüft ein Token und gibt (user_id, Fehlermeldung) zurück"""
+    if not token:
+        return None, 'Token fehlt'
+
+    try:
+        payload = verify_token(token, JWT_SECRET, token_cache)
+    except jwt.ExpiredSignatureError:
+        return None, 'Token abgelaufen'
+    except jwt.InvalidTokenError:
+        return None, 'Ungültiges Token'
+
+    try:
+        return int(payload.get('sub')), None
+    except (TypeError, ValueError):
+        return None, 'Ungültiger Token'
+
+
+def authenticate_request():
+    """Prüft das Token des aktuellen Requests genau einmal und merkt sich das Ergebnis in g"""
+    if 'auth' not in g:
+        g.auth = _authenticate(extract_token(request))
+    return g.auth
+
+
+def load_user(user_id):
+    """Lädt einen User höchstens einmal pro Request"""
+    users = g.setdefault('users', {})
+    if user_id not in users:
+        users[user_id] = db.session.get(User, user_id)
+    return users[user_id]
+
+
+def current_user():
+    """User des aktuellen Tokens oder None"""
+    user_id = get_current_user_id()
+    return load_user(user_id) if user_id else None
+
+
 def token_required(f):
     """Decorator für Token-geschützte Endpoints"""
 
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        token = None
-        auth_header = request.headers.get('Authorization')
+        user_id, error = authenticate_request()
+        if error:
+            return jsonify({'error': error}), 401
 
-        # Prüfe Authorization Header
-        if auth_header and auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]
-            print(f"🔐 Token aus Header: {token[:30]}...")
+        request.user_id = user_id
+        return f(*args, **kwargs)
 
-        # Prüfe Cookies
-        if not token:
-            token = request.cookies.get('access_token')
-            print(f"🍪 Token aus Cookie: {'Ja' if token else 'Nein'}")
+    return decorated_function
 
-        if not token:
-            print("❌ Kein Token gefunden")
-            return jsonify({'error': 'Token fehlt'}), 401
+def read_only(f):
+    """Decorator für reine Lese-Routen: SELECTs laufen über die Read-only-Engine"""
 
-        try:
-            # Token dekodieren
-            payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-            user_id_str = payload.get('sub')
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.read_only = True
+        return f(*args, **kwargs)
 
-            if not user_id_str:
-                return jsonify({'error': 'Ungültiger Token'}), 401
+    return decorated_function
 
-            # Konvertiere zu Integer und setze in request
-            request.user_id = int(user_id_str)
-            print(f"✅ Token validiert für User ID: {request.user_id}")
 
-        except jwt.ExpiredSignatureError:
-            print("❌ Token abgelaufen")
-            return jsonify({'error': 'Token abgelaufen'}), 401
-        except jwt.InvalidTokenError as e:
-            print(f"❌ Ungültiges Token: {e}")
-            return jsonify({'error': 'Ungültiges Token'}), 401
-        except Exception as e:
-            print(f"❌ Token Fehler: {e}")
-            return jsonify({'error': 'Token Fehler'}), 401
+class RoutingSession(Session):
+    """Schickt SELECTs aus read_only-Routen an die "read"-Engine, alles andere an die Haupt-Engine"""
 
-        return f(*args, **kwargs)
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and "read" in self._db.engines
+                and getattr(clause, "is_select", False)
+                and has_request_context() and g.get("read_only")):
+            return self._db.engines["read"]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(app, session_options={"class_": RoutingSession})
 
-    return decorated_function
 
-db = SQLAlchemy(app)
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Am Execution-Context statt an der Verbindung: scheitert das Statement, bleibt nichts zurück
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_started', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    if has_request_context() and 'sql_statements' in g:
+        g.sql_statements += 1
+        g.sql_seconds += elapsed
+
+
+with app.app_context():
+    for bind_key, engine in db.engines.items():
+        if engine.dialect.name == 'sqlite':
+            sqlite_tuning.apply_pragmas(engine, sqlite_pragmas, read_only=bind_key == 'read')
+        db.event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        db.event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
 
 # Assoziationstabelle für M:N-Beziehung
 user_workouts = db.Table('user_workouts',
@@ -109,8 +374,11 @@ user_workouts = db.Table('user_workouts',
                          db.Column('workout_id', db.Integer, db.ForeignKey('workouts.id'), primary_key=True),
                          db.Column('created_at', db.DateTime, default=datetime.now),
                          db.Column('is_favorite', db.Boolean, default=False),
-                         db.Column('progress', db.Integer, default=0)  # 0-100%
+                         db.Column('progress', db.Integer, default=0),  # 0-100%
                          )
+# Abo-Liste eines Users: Favoriten zuerst, dann nach workout_id - passt zur Keyset-Sortierung
+db.Index('ix_user_workouts_user_favorite', user_workouts.c.user_id,
+         user_workouts.c.is_favorite.desc(), user_workouts.c.workout_id)
 
 
 class Workout(db.Model):
@@ -119,11 +387,20 @@ class Workout(db.Model):
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     duration = db.Column(db.Integer)
-    difficulty = db.Column(db.Enum('Anfänger', 'Fortgeschritten', 'Profi', 'beginner', 'intermediate', 'expert'))
+    # native_enum=False: VARCHAR wie bisher unter SQLite, kein CREATE TYPE unter PostgreSQL
+    difficulty = db.Column(db.Enum('Anfänger', 'Fortgeschritten', 'Profi', 'beginner', 'intermediate', 'expert',
+                                   name='workout_difficulty', native_enum=False))
     category = db.Column(db.String(50))
-    api_exercise_id = db.Column(db.String(100))
+    api_exercise_id = db.Column(db.String(100), index=True, unique=True)
     created_at = db.Column(db.DateTime, default=datetime.now)
 
+    # Für die Filter von GET /workouts; id am Ende hält die Keyset-Sortierung im Index
+    __table_args__ = (
+        db.Index('ix_workouts_category_id', 'category', 'id'),
+        db.Index('ix_workouts_difficulty_id', 'difficulty', 'id'),
+        db.Index('ix_workouts_duration_id', 'duration', 'id'),
+    )
+
     subscribed_users = db.relationship(
         'User',
         secondary=user_workouts,
@@ -145,133 +422,340 @@ class User(db.Model):
     )
 
 
-# Datenbank initialisieren und Name-Spalte hinzufügen falls nötig
-with app.app_context():
-    try:
-        # Versuche die name-Spalte hinzuzufügen
-        db.session.execute('ALTER TABLE user ADD COLUMN name VARCHAR(100)')
-        db.session.commit()
-        print("Name-Spalte zur User-Tabelle hinzugefügt")
-    except Exception as e:
-        print(f"Spalte existiert bereits oder Fehler: {e}")
-        db.session.rollback()
+suggest_index = PrefixIndex()
+_suggest_index_lock = threading.Lock()
+_suggest_index_refreshing = threading.Event()
+
+
+def load_suggest_index():
+    """Baut den Typeahead-Index aus allen Workouts (samt Abonnenten) und den Namen im API-Cache"""
+    subscribers = db.func.count(user_workouts.c.user_id)
+    workouts = db.session.execute(
+        select(Workout.id, Workout.name, subscribers)
+        .outerjoin(user_workouts, user_workouts.c.workout_id == Workout.id)
+        .group_by(Workout.id, Workout.name)
+    ).all()
+    api_names = (exercise.get('name') for payload in exercise_cache.payloads()
+                 for exercise in payload if isinstance(exercise, dict) and exercise.get('name'))
+    suggest_index.rebuild(workouts, api_names)
+
 
-    db.create_all()
+def build_suggest_index():
+    """Baut den Index einmal - wer gleichzeitig kommt, wartet auf diesen Aufbau"""
+    with _suggest_index_lock:
+        if suggest_index.built_at is None:
+            load_suggest_index()
+
+
+def preload_suggest_index():
+    """Baut den Index im Hintergrund, damit nicht der erste /workouts/suggest darauf wartet"""
+    def preload():
+        try:
+            with app.app_context():
+                build_suggest_index()
+        except Exception:
+            logger.exception("Typeahead-Index konnte nicht vorab gebaut werden")
+
+    threading.Thread(target=preload, name="suggest-index-preload", daemon=True).start()
+
+
+def ensure_suggest_index():
+    """Baut den Index, falls er noch fehlt; ist er älter als SUGGEST_INDEX_MAX_AGE, im Hintergrund neu"""
+    if suggest_index.built_at is None:
+        build_suggest_index()
+        return
+
+    # Andere Worker schreiben auch - deren Änderungen kommen so spätestens nach MAX_AGE an
+    if time.monotonic() - suggest_index.built_at > SUGGEST_INDEX_MAX_AGE and not _suggest_index_refreshing.is_set():
+        _suggest_index_refreshing.set()
+
+        def refresh():
+            try:
+                with app.app_context():
+                    load_suggest_index()
+            except Exception:
+                logger.exception("Typeahead-Index konnte nicht erneuert werden")
+            finally:
+                _suggest_index_refreshing.clear()
+
+        threading.Thread(target=refresh, name="suggest-index-refresh", daemon=True).start()
+
+
+def index_suggest_names(items):
+    """Trägt (name, workout_id) inkrementell nach - solange der Index noch nicht gebaut ist, entfällt das"""
+    if suggest_index.built_at is not None:
+        suggest_index.add_many([(name, workout_id) for name, workout_id in items if name])
+
+
+def insert_ignoring_conflicts(model, *index_elements):
+    """INSERT ... ON CONFLICT DO NOTHING unter SQLite und PostgreSQL, sonst ein normales INSERT"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return sqlite_insert(model).on_conflict_do_nothing(index_elements=index_elements)
+    if dialect == 'postgresql':
+        return postgresql_insert(model).on_conflict_do_nothing(index_elements=index_elements)
+    return insert(model)
 
 
 # Service-Klasse für Workout-Logik
 class WorkoutService:
     @staticmethod
     def fetch_exercises_from_api(muscle=None, difficulty=None, type=None):
-        """Holt Exercises von API Ninjas mit erweiterter Fehlerbehandlung"""
+        """Holt Exercises von API Ninjas - über den Exercise-Cache"""
+        key = normalize_key(muscle, difficulty, type)
+        # Upstream bekommt dieselben normalisierten Werte, unter denen das Ergebnis gecacht wird
+        muscle, difficulty, type = key_params(key)
         try:
-            url = "https://api.api-ninjas.com/v1/exercises"
-            params = {}
-            if muscle:
-                params['muscle'] = muscle
-            if difficulty:
-                params['difficulty'] = difficulty.lower()
-            if type:
-                params['type'] = type
-
-            headers = {'X-Api-Key': API_NINJAS_KEY}
-
-            response = requests.get(url, headers=headers, params=params, timeout=10)
-
-            if response.status_code == 200:
-                return response.json()
-            else:
-                print(f"API Error: {response.status_code} - {response.text}")
-                return []
+            exercises = exercise_cache.get_or_fetch(
+                key,
+                lambda: WorkoutService._request_exercises(muscle, difficulty, type)
+            )
+            index_suggest_names((exercise.get('name'), None) for exercise in exercises)
+            return exercises
         except Exception as e:
-            print(f"Error fetching from API: {str(e)}")
+            logger.warning("Error fetching from API: %s", e)
             return []
 
     @staticmethod
-    def save_exercises_to_db(exercises_data):
-        """Speichert Exercises in der Datenbank"""
-        saved_count = 0
+    def _request_exercises(muscle=None, difficulty=None, type=None):
+        """Ruft API Ninjas direkt auf und wirft bei Fehlern eine Exception"""
+        return exercise_provider.fetch_exercises(muscle, difficulty, type)
+
+    @staticmethod
+    def refresh_catalog(muscles=None, types=None):
+        """Lädt alle muscle/type-Kombinationen parallel, füllt den Cache und speichert neue Exercises"""
+        combinations = [
+            {'muscle': muscle, 'type': type}
+            for muscle in (muscles or MUSCLES)
+            for type in (types or EXERCISE_TYPES)
+        ]
+
+        exercises = []
+        failed = 0
+        for combination, result, error in exercise_provider.fetch_many(combinations):
+            if error:
+                logger.warning("Katalog-Refresh für %s fehlgeschlagen: %s", combination, error)
+                failed += 1
+                continue
+            exercise_cache.set(normalize_key(combination['muscle'], None, combination['type']), result)
+            exercises.extend(result)
+
+        import_result = WorkoutService.save_exercises_to_db(exercises)
+        return {
+            'combinations': len(combinations),
+            'failed': failed,
+            'total_from_api': len(exercises),
+            **import_result
+        }
+
+    @staticmethod
+    def save_exercises_to_db(exercises_data, update_existing=True, chunk_size=500):
+        """Speichert Exercises per Bulk-Upsert (ein IN-Lookup und ein executemany pro Chunk)
+
+        Gibt die Anzahl eingefügter, aktualisierter und übersprungener Exercises zurück.
+        """
+        difficulty_map = {
+            'beginner': 'Anfänger',
+            'intermediate': 'Fortgeschritten',
+            'expert': 'Profi'
+        }
+
+        rows = {}
+        skipped = 0
         for exercise in exercises_data:
-            existing = Workout.query.filter_by(
-                name=exercise.get('name'),
-                api_exercise_id=exercise.get('name')
-            ).first()
-
-            if not existing:
-                difficulty_map = {
-                    'beginner': 'Anfänger',
-                    'intermediate': 'Fortgeschritten',
-                    'expert': 'Profi'
-                }
+            api_exercise_id = exercise.get('name')
+            # Ohne Namen kein Schlüssel, doppelte Einträge im selben Import nur einmal
+            if not api_exercise_id or api_exercise_id in rows:
+                skipped += 1
+                continue
+
+            rows[api_exercise_id] = {
+                'name': api_exercise_id,
+                'description': exercise.get('instructions', ''),
+                'difficulty': difficulty_map.get(exercise.get('difficulty', 'beginner'), 'Anfänger'),
+                'category': exercise.get('type', 'Allgemein'),
+                'api_exercise_id': api_exercise_id,
+                'duration': 10
+            }
 
-                new_workout = Workout(
-                    name=exercise.get('name', 'Unbekannte Übung'),
-                    description=exercise.get('instructions', ''),
-                    difficulty=difficulty_map.get(exercise.get('difficulty', 'beginner'), 'Anfänger'),
-                    category=exercise.get('type', 'Allgemein'),
-                    api_exercise_id=exercise.get('name'),
-                    duration=10
-                )
-                db.session.add(new_workout)
-                saved_count += 1
+        inserted = 0
+        updated = 0
+        added = []  # (name, id) der neuen Workouts für den Typeahead-Index
+        keys = list(rows)
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start:start + chunk_size]
+
+            existing = db.session.execute(
+                select(Workout.id, Workout.api_exercise_id, Workout.description,
+                       Workout.difficulty, Workout.category)
+                .where(Workout.api_exercise_id.in_(chunk))
+            ).all()
+
+            changes = []
+            for row in existing:
+                new = rows.pop(row.api_exercise_id)
+                current = (row.description, row.difficulty, row.category)
+                if not update_existing or current == (new['description'], new['difficulty'], new['category']):
+                    skipped += 1
+                    continue
+                changes.append({
+                    'id': row.id,
+                    'description': new['description'],
+                    'difficulty': new['difficulty'],
+                    'category': new['category']
+                })
+
+            new_rows = [rows[key] for key in chunk if key in rows]
+            if new_rows:
+                # Ein paralleler Import derselben Kombination kann zwischen Lookup und INSERT
+                # zuschlagen - dessen Zeilen werden übersprungen statt mit IntegrityError abzubrechen
+                created = db.session.execute(
+                    insert_ignoring_conflicts(Workout, 'api_exercise_id').returning(Workout.name, Workout.id),
+                    new_rows
+                ).all()
+                added.extend(created)
+                inserted += len(created)
+                skipped += len(new_rows) - len(created)
+            if changes:
+                db.session.execute(update(Workout), changes)
+                updated += len(changes)
 
         db.session.commit()
-        return saved_count
+        index_suggest_names(added)
+        return {'inserted': inserted, 'updated': updated, 'skipped': skipped}
 
     @staticmethod
     def subscribe_user_to_workout(user_id, workout_id):
         """Abonniert ein Workout für einen User"""
-        user = User.query.get(user_id)
-        workout = Workout.query.get(workout_id)
+        user = load_user(user_id)
+        workout = db.session.get(Workout, workout_id)
 
         if not user or not workout:
             return False, "User oder Workout nicht gefunden"
 
-        if workout in user.subscribed_workouts:
+        if WorkoutService.is_subscribed(user_id, workout_id):
             return False, "Workout bereits abonniert"
 
-        user.subscribed_workouts.append(workout)
-        db.session.commit()
+        try:
+            db.session.execute(insert(user_workouts).values(user_id=user_id, workout_id=workout_id))
+            db.session.commit()
+        except IntegrityError:
+            # Ein paralleler Request hat dasselbe Abo zwischen Prüfung und INSERT angelegt
+            db.session.rollback()
+            return False, "Workout bereits abonniert"
+        suggest_index.adjust_subscribers(workout_id, 1)
         return True, "Erfolgreich abonniert"
 
     @staticmethod
     def unsubscribe_user_from_workout(user_id, workout_id):
         """Entfernt ein Workout-Abonnement"""
-        user = User.query.get(user_id)
-        workout = Workout.query.get(workout_id)
+        deleted = db.session.execute(user_workouts.delete().where(
+            user_workouts.c.user_id == user_id,
+            user_workouts.c.workout_id == workout_id
+        )).rowcount
+        db.session.commit()
+        if deleted:
+            suggest_index.adjust_subscribers(workout_id, -1)
+            return True, "Erfolgreich deabonniert"
 
-        if not user or not workout:
+        # Nur im Fehlerfall klären, was fehlt
+        if not load_user(user_id) or not db.session.get(Workout, workout_id):
             return False, "User oder Workout nicht gefunden"
+        return False, "Workout nicht abonniert"
 
-        if workout not in user.subscribed_workouts:
-            return False, "Workout nicht abonniert"
+    @staticmethod
+    def is_subscribed(user_id, workout_id):
+        """Existenzprüfung über den Primärschlüssel (user_id, workout_id) - ohne die Collection zu laden"""
+        return db.session.execute(select(user_workouts.c.user_id).where(
+            user_workouts.c.user_id == user_id,
+            user_workouts.c.workout_id == workout_id
+        )).first() is not None
 
-        user.subscribed_workouts.remove(workout)
+    @staticmethod
+    def subscribe_many(user_id, workout_ids):
+        """Abonniert viele Workouts in einer Transaktion.
+
+        Gibt ein Dict mit den Listen subscribed, already_subscribed und
+        not_found zurück.
+        """
+        workout_ids = set(workout_ids)
+        known = set(db.session.scalars(select(Workout.id).where(Workout.id.in_(workout_ids))))
+        existing = set(db.session.scalars(select(user_workouts.c.workout_id).where(
+            user_workouts.c.user_id == user_id,
+            user_workouts.c.workout_id.in_(known)
+        ))) if known else set()
+
+        new = known - existing
+        if new:
+            now = datetime.now()
+            db.session.execute(insert(user_workouts), [
+                {'user_id': user_id, 'workout_id': workout_id, 'created_at': now,
+                 'is_favorite': False, 'progress': 0}
+                for workout_id in new
+            ])
         db.session.commit()
-        return True, "Erfolgreich deabonniert"
+        for workout_id in new:
+            suggest_index.adjust_subscribers(workout_id, 1)
+        return {
+            'subscribed': sorted(new),
+            'already_subscribed': sorted(existing),
+            'not_found': sorted(workout_ids - known),
+        }
 
     @staticmethod
-    def get_user_workouts(user_id):
-        """Holt alle abonnierten Workouts eines Users"""
-        try:
-            from sqlalchemy.orm import joinedload
-            
-            user = User.query.options(joinedload(User.subscribed_workouts)).get(user_id)
-            if not user:
-                print(f" User {user_id} nicht in Datenbank gefunden")
-                return []
-            
-            workouts = user.subscribed_workouts
-            print(f" User {user_id} hat {len(workouts)} abonnierte Workouts")
-            
-            for workout in workouts:
-                print(f"   - {workout.name} (ID: {workout.id})")
-                
-            return workouts
-            
-        except Exception as e:
-            print(f" Fehler in get_user_workouts Service: {str(e)}")
-            return []
+    def unsubscribe_many(user_id, workout_ids):
+        """Entfernt viele Abonnements in einer Transaktion (unsubscribed / not_subscribed)"""
+        workout_ids = set(workout_ids)
+        existing = set(db.session.scalars(select(user_workouts.c.workout_id).where(
+            user_workouts.c.user_id == user_id,
+            user_workouts.c.workout_id.in_(workout_ids)
+        )))
+        if existing:
+            db.session.execute(user_workouts.delete().where(
+                user_workouts.c.user_id == user_id,
+                user_workouts.c.workout_id.in_(existing)
+            ))
+        db.session.commit()
+        for workout_id in existing:
+            suggest_index.adjust_subscribers(workout_id, -1)
+        return {
+            'unsubscribed': sorted(existing),
+            'not_subscribed': sorted(workout_ids - existing),
+        }
+
+    @staticmethod
+    def list_subscriptions(user_id, limit=None, after=None, fields=None):
+        """Abos eines Users samt Abo-Daten in einer Abfrage - Favoriten zuerst, dann nach workout_id.
+
+        after ist der Keyset-Cursor (is_favorite, workout_id) der letzten
+        Zeile der vorherigen Seite. Mit fields werden nur diese Workout-Spalten
+        geladen. Gibt Tupel (Workout, is_favorite, progress, created_at) zurück.
+        """
+        return db.session.execute(WorkoutService.subscriptions_query(user_id, limit, after, fields)).all()
+
+    @staticmethod
+    def subscriptions_query(user_id, limit=None, after=None, fields=None):
+        """Das SELECT hinter list_subscriptions"""
+        query = select(
+            Workout, user_workouts.c.is_favorite, user_workouts.c.progress, user_workouts.c.created_at
+        ).join(
+            user_workouts, user_workouts.c.workout_id == Workout.id
+        ).where(user_workouts.c.user_id == user_id)
+        if fields:
+            query = query.options(workout_columns(fields))
+
+        if after is not None:
+            is_favorite, workout_id = after
+            same_group = db.and_(user_workouts.c.is_favorite == is_favorite,
+                                 user_workouts.c.workout_id > workout_id)
+            # Nach dem letzten Favoriten folgen alle Nicht-Favoriten
+            query = query.where(db.or_(user_workouts.c.is_favorite == False, same_group)
+                                if is_favorite else same_group)
+
+        query = query.order_by(user_workouts.c.is_favorite.desc(), user_workouts.c.workout_id)
+        if limit is not None:
+            query = query.limit(limit)
+        return query
 
 
 # Streak-Tabelle
@@ -281,8 +765,16 @@ class StreakExercise(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     workout_id = db.Column(db.Integer, db.ForeignKey('workouts.id'), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    # = timestamp.date(), gespeichert damit Tagesfilter einen Index nutzen können
+    activity_day = db.Column(db.Date)
     created_at = db.Column(db.DateTime, default=datetime.now)
 
+    __table_args__ = (
+        db.Index('ix_streak_exercises_user_ts', 'user_id', 'timestamp'),
+        db.Index('ix_streak_exercises_user_workout_ts', 'user_id', 'workout_id', 'timestamp'),
+        db.Index('ix_streak_exercises_user_day', 'user_id', 'activity_day'),
+    )
+
     # Relationships
     user = db.relationship('User', backref=db.backref('streak_activities', lazy=True))
     workout = db.relationship('Workout', backref=db.backref('streak_activities', lazy=True))
@@ -297,127 +789,281 @@ class StreakExercise(db.Model):
         }
 
 
-def check_and_refresh_token():
-    """Prüft Token und refreshed wenn nötig - für längere Sessions"""
-    token = None
-    auth_header = request.headers.get('Authorization')
+@db.event.listens_for(StreakExercise, 'before_insert')
+def _set_activity_day(mapper, connection, target):
+    if target.activity_day is None:
+        target.activity_day = (target.timestamp or datetime.now()).date()
 
-    if auth_header and auth_header.startswith('Bearer '):
-        token = auth_header.split(' ')[1]
 
-    if not token:
-        token = request.cookies.get('access_token')
+# Tages-Rollup der Streak-Einträge - wird in add_streak/delete_streak mitgepflegt
+class UserActivityDay(db.Model):
+    __tablename__ = 'user_activity_days'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    workout_id = db.Column(db.Integer, db.ForeignKey('workouts.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
 
-    if not token:
-        return None
+    __table_args__ = (
+        db.Index('ix_user_activity_days_user_day', 'user_id', 'day'),
+    )
+
+
+def record_activity(user_id, workout_id, day, delta):
+    """Passt die Tagessumme an - ohne Commit, läuft in der Transaktion des Aufrufers"""
+    row = db.session.get(UserActivityDay, (user_id, workout_id, day))
+    if row is None:
+        if delta > 0:
+            db.session.add(UserActivityDay(user_id=user_id, workout_id=workout_id, day=day, count=delta))
+        return
+
+    row.count += delta
+    if row.count <= 0:
+        db.session.delete(row)
+
+
+def rebuild_activity_days():
+    """Baut user_activity_days komplett aus streak_exercises neu auf"""
+    db.session.execute(db.delete(UserActivityDay))
+    db.session.execute(
+        insert(UserActivityDay).from_select(
+            ['user_id', 'workout_id', 'day', 'count'],
+            select(
+                StreakExercise.user_id,
+                StreakExercise.workout_id,
+                StreakExercise.activity_day,
+                db.func.count()
+            ).group_by(
+                StreakExercise.user_id,
+                StreakExercise.workout_id,
+                StreakExercise.activity_day
+            )
+        )
+    )
+    db.session.commit()
+    return UserActivityDay.query.count()
+
+
+ALL_WORKOUTS = streaks.ALL_WORKOUTS
 
-    try:
-        # Versuche Token zu dekodieren
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        return int(payload.get('sub'))
-    except jwt.ExpiredSignatureError:
-        print("⚠️ Access Token abgelaufen, versuche Refresh...")
-        # Token ist abgelaufen, aber das ist okay für manche Endpoints
-        # Wir geben None zurück, der Endpoint kann entscheiden ob er Refresh versucht
-        return None
-    except Exception as e:
-        print(f"❌ Token Fehler: {e}")
-        return None
 
+# Gespeicherter Streak-Zustand pro User und pro (User, Workout)
+class StreakState(db.Model):
+    __tablename__ = 'streak_states'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    workout_id = db.Column(db.Integer, primary_key=True)  # ALL_WORKOUTS = über alle Workouts
+    current_run = db.Column(db.Integer, nullable=False, default=0)
+    longest_run = db.Column(db.Integer, nullable=False, default=0)
+    longest_end = db.Column(db.Date)
+    last_day = db.Column(db.Date)
+    total_entries = db.Column(db.Integer, nullable=False, default=0)
+
+    FIELDS = ('current_run', 'longest_run', 'longest_end', 'last_day', 'total_entries')
+
+    def as_state(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def apply(self, state):
+        for field in self.FIELDS:
+            setattr(self, field, state[field])
+
+
+# Schema wird beim Deploy per `flask db-upgrade` migriert - hier nur die Version prüfen
+with app.app_context():
+    schema_version = migrations.current_version(db.engine)
+    if schema_version < migrations.latest_version():
+        logger.warning("Datenbank-Schema auf Version %s, erwartet %s - bitte `flask db-upgrade` ausführen",
+                       schema_version, migrations.latest_version())
+    elif SUGGEST_INDEX_PRELOAD:
+        preload_suggest_index()
+
+
+def check_and_refresh_token():
+    """Prüft Token - None wenn es fehlt, ungültig oder abgelaufen ist (Endpoint entscheidet über Refresh)"""
+    return get_current_user_id()
 
 
 # Streaks mit cookies
 def get_current_user_id():
-    """Extrahiert user_id aus JWT Token, versucht Refresh wenn abgelaufen"""
-    token = None
-    auth_header = request.headers.get('Authorization')
+    """Extrahiert user_id aus dem JWT Token des Requests (einmal pro Request geprüft)"""
+    user_id, _ = authenticate_request()
+    return user_id
 
-    if auth_header and auth_header.startswith('Bearer '):
-        token = auth_header.split(' ')[1]
-        print(f"✅ Token aus Header: {token[:30]}...")
 
-    if not token:
-        token = request.cookies.get('access_token')
-        print(f"🔄 Token aus Cookie: {'Ja' if token else 'Nein'}")
+def _active_days(user_id, workout_id):
+    """Query über die aktiven Tage einer Streak-Ebene (ein Workout oder ALL_WORKOUTS)"""
+    query = db.session.query(UserActivityDay.day).filter(UserActivityDay.user_id == user_id)
+    if workout_id == ALL_WORKOUTS:
+        return query.distinct()
+    return query.filter(UserActivityDay.workout_id == workout_id)
 
-    if not token:
-        print("❌ Kein Token gefunden")
-        return None
 
-    try:
-        # Token dekodieren
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        user_id = int(payload.get('sub'))
-        print(f"✅ Token gültig, User ID: {user_id}")
-        return user_id
+def _get_or_create_streak_state(user_id, workout_id):
+    row = db.session.get(StreakState, (user_id, workout_id))
+    if row is None:
+        row = StreakState(user_id=user_id, workout_id=workout_id,
+                          current_run=0, longest_run=0, total_entries=0)
+        db.session.add(row)
+    return row
 
-    except jwt.ExpiredSignatureError:
-        print("⚠️ Access Token abgelaufen")
-        # Hier könnten wir einen automatischen Refresh versuchen
-        # Aber für einfache Logik geben wir None zurück
-        return None
-    except Exception as e:
-        print(f"❌ Token Fehler: {e}")
-        return None
 
-def calculate_streak_for_workout(user_id, workout_id):
-    """Berechnet aktuelle Streak-Länge für ein Workout"""
-    from datetime import date, timedelta
+def recompute_streak_state(row):
+    """Berechnet die Läufe einer Ebene aus den Rollup-Tagen neu (ohne Commit)"""
+    days = [day for (day,) in _active_days(row.user_id, row.workout_id).order_by(UserActivityDay.day)]
+    row.apply(streaks.compute_state(days, row.total_entries))
 
-    # Hole alle Streak-Einträge für dieses Workout und User
-    streaks = StreakExercise.query.filter_by(
-        user_id=user_id,
-        workout_id=workout_id
-    ).order_by(StreakExercise.timestamp.desc()).all()
 
-    if not streaks:
-        return 0
+def update_streak_state_on_add(user_id, workout_id, day):
+    """Trägt einen neuen Eintrag in O(1) in beide Ebenen ein (ohne Commit)"""
+    for level in (workout_id, ALL_WORKOUTS):
+        row = _get_or_create_streak_state(user_id, level)
+        row.total_entries += 1
 
-    # Konvertiere zu Datums-Objekten (ohne Uhrzeit)
-    streak_dates = set()
-    for streak in streaks:
-        streak_date = streak.timestamp.date()
-        streak_dates.add(streak_date)
-
-    # Sortiere Datumsliste absteigend
-    sorted_dates = sorted(streak_dates, reverse=True)
-
-    # Berechne aktuelle Streak-Länge
-    current_streak = 0
-    current_date = date.today()
-
-    # Prüfe ob heute schon ein Eintrag existiert
-    if sorted_dates[0] == current_date:
-        current_streak = 1
-        # Gehe zurück und prüfe aufeinanderfolgende Tage
-        for i in range(1, len(sorted_dates)):
-            expected_date = current_date - timedelta(days=i)
-            if sorted_dates[i] == expected_date:
-                current_streak += 1
-            else:
-                break
-    # Prüfe ob gestern ein Eintrag existiert (Streak läuft noch)
-    elif sorted_dates[0] == current_date - timedelta(days=1):
-        current_streak = 1
-        # Gehe weiter zurück
-        for i in range(1, len(sorted_dates)):
-            expected_date = (current_date - timedelta(days=1)) - timedelta(days=i - 1)
-            if sorted_dates[i] == expected_date:
-                current_streak += 1
+        state = row.as_state()
+        if streaks.advance(state, day):
+            row.apply(state)
+        else:
+            # Nachgetragener Tag kann Läufe verbinden
+            recompute_streak_state(row)
+
+
+def update_streak_states_bulk(user_id, days_by_workout):
+    """Trägt viele neue Einträge auf einmal in beide Ebenen ein (ohne Commit).
+
+    days_by_workout bildet workout_id auf die Tage der neuen Einträge ab (ein
+    Tag pro Eintrag). Zurück kommen die StreakState-Zeilen nach workout_id.
+    """
+    levels = defaultdict(list)
+    for workout_id, days in days_by_workout.items():
+        levels[workout_id].extend(days)
+        levels[ALL_WORKOUTS].extend(days)
+
+    rows = {row.workout_id: row for row in StreakState.query.filter(
+        StreakState.user_id == user_id, StreakState.workout_id.in_(list(levels)))}
+    for level, days in levels.items():
+        row = rows.get(level)
+        if row is None:
+            row = rows[level] = StreakState(user_id=user_id, workout_id=level,
+                                            current_run=0, longest_run=0, total_entries=0)
+            db.session.add(row)
+        row.total_entries += len(days)
+
+        state = row.as_state()
+        if all(streaks.advance(state, day) for day in sorted(days)):
+            row.apply(state)
+        else:
+            # Nachgetragene Tage vor last_day - einmal pro Ebene neu rechnen statt pro Eintrag
+            recompute_streak_state(row)
+    return rows
+
+
+def update_streak_state_on_delete(user_id, workout_id, day):
+    """Repariert beide Ebenen nach dem Löschen eines Eintrags, nur im betroffenen Lauf (ohne Commit)"""
+    for level in (workout_id, ALL_WORKOUTS):
+        row = db.session.get(StreakState, (user_id, level))
+        if row is None:
+            continue
+
+        row.total_entries = max(0, row.total_entries - 1)
+
+        # Tag ist noch aktiv (weiterer Eintrag oder anderes Workout) -> Läufe unverändert
+        still_active = _active_days(user_id, level).filter(UserActivityDay.day == day)
+        if db.session.query(still_active.exists()).scalar():
+            continue
+
+        if streaks.in_run(day, row.last_day, row.current_run):
+            if day == row.last_day:
+                # Lauf endet jetzt am vorherigen aktiven Tag - nur diesen Lauf rückwärts lesen
+                earlier = (
+                    d for (d,) in _active_days(user_id, level)
+                    .filter(UserActivityDay.day < day)
+                    .order_by(UserActivityDay.day.desc())
+                    .yield_per(64)
+                )
+                previous = next(earlier, None)
+                row.last_day = previous
+                row.current_run = (
+                    streaks.run_ending_at(itertools.chain([previous], earlier), previous) if previous else 0
+                )
             else:
-                break
+                row.current_run = (row.last_day - day).days
+
+        if streaks.in_run(day, row.longest_end, row.longest_run):
+            # Der längste Lauf ist gebrochen - über die kompakten Tageszeilen neu bestimmen
+            days = [d for (d,) in _active_days(user_id, level).order_by(UserActivityDay.day)]
+            full = streaks.compute_state(days)
+            row.longest_run = full['longest_run']
+            row.longest_end = full['longest_end']
+
+
+def compute_streak_states(user_id=None):
+    """Volle Neuberechnung aller Streak-Zustände aus streak_exercises"""
+    query = db.session.query(StreakExercise.user_id, StreakExercise.workout_id, StreakExercise.activity_day)
+    if user_id is not None:
+        query = query.filter(StreakExercise.user_id == user_id)
+
+    days = defaultdict(set)
+    totals = Counter()
+    for entry_user_id, workout_id, day in query.yield_per(5000):
+        for key in ((entry_user_id, workout_id), (entry_user_id, ALL_WORKOUTS)):
+            days[key].add(day)
+            totals[key] += 1
+
+    return {key: streaks.compute_state(sorted(days[key]), totals[key]) for key in days}
+
+
+def rebuild_streak_states():
+    """Baut streak_states komplett neu auf"""
+    states = compute_streak_states()
+    db.session.execute(db.delete(StreakState))
+    if states:
+        db.session.execute(insert(StreakState), [
+            {'user_id': user_id, 'workout_id': workout_id, **state}
+            for (user_id, workout_id), state in states.items()
+        ])
+    db.session.commit()
+    return len(states)
+
+
+def check_streak_states(repair=False):
+    """Vergleicht gespeicherte Streak-Zustände mit einer vollen Neuberechnung"""
+    expected = compute_streak_states()
+    stored = {(row.user_id, row.workout_id): row for row in StreakState.query}
+
+    mismatches = []
+    for key in expected.keys() | stored.keys():
+        want = expected.get(key)
+        row = stored.get(key)
+        have = row.as_state() if row else None
+        # Zeilen ohne Einträge sind gleichwertig zu fehlenden Zeilen
+        if have is not None and not have['total_entries'] and want is None:
+            continue
+        if have != want:
+            mismatches.append({'user_id': key[0], 'workout_id': key[1], 'stored': have, 'expected': want})
+            if repair:
+                if want is None:
+                    db.session.delete(row)
+                elif row is None:
+                    db.session.add(StreakState(user_id=key[0], workout_id=key[1], **want))
+                else:
+                    row.apply(want)
+
+    if repair:
+        db.session.commit()
+    return mismatches
 
-    return current_streak
+
+def calculate_streak_for_workout(user_id, workout_id):
+    """Aktuelle Streak-Länge für ein Workout - aus dem gespeicherten Zustand"""
+    row = db.session.get(StreakState, (user_id, workout_id))
+    if row is None:
+        return 0
+    return streaks.current_streak(row.last_day, row.current_run)
 
 
 def get_streak_stats(user_id):
     """Gibt allgemeine Streak-Statistiken zurück"""
-    from datetime import date, timedelta
-
-    # Alle Streaks des Users
-    all_streaks = StreakExercise.query.filter_by(user_id=user_id).all()
-
-    if not all_streaks:
+    row = db.session.get(StreakState, (user_id, ALL_WORKOUTS))
+    if row is None or row.last_day is None:
         return {
             'total_workouts_logged': 0,
             'current_streak': 0,
@@ -425,94 +1071,89 @@ def get_streak_stats(user_id):
             'today_logged': False
         }
 
-    # Konvertiere zu Datums-Set
-    streak_dates = set()
-    for streak in all_streaks:
-        streak_dates.add(streak.timestamp.date())
+    recent_dates = [
+        day for (day,) in _active_days(user_id, ALL_WORKOUTS)
+        .order_by(UserActivityDay.day.desc())
+        .limit(10)
+    ]
 
-    sorted_dates = sorted(streak_dates)
+    return {
+        'total_workouts_logged': row.total_entries,
+        'current_streak': streaks.current_streak(row.last_day, row.current_run),
+        'longest_streak': row.longest_run,
+        'today_logged': row.last_day == date.today(),
+        'streak_dates': [d.isoformat() for d in reversed(recent_dates)]  # Letzte 10 Tage
+    }
 
-    # Berechne längsten Streak
-    longest_streak = 1
-    current_run = 1
 
-    for i in range(1, len(sorted_dates)):
-        if sorted_dates[i] == sorted_dates[i - 1] + timedelta(days=1):
-            current_run += 1
-            longest_streak = max(longest_streak, current_run)
-        else:
-            current_run = 1
+ACTIVITY_BUCKETS = ('day', 'week', 'month')
+ACTIVITY_MAX_DAYS = 3 * 366
 
-    # Berechne aktuellen Streak
-    current_streak = calculate_current_streak(sorted_dates)
 
-    return {
-        'total_workouts_logged': len(all_streaks),
-        'current_streak': current_streak,
-        'longest_streak': longest_streak,
-        'today_logged': date.today() in streak_dates,
-        'streak_dates': [d.isoformat() for d in sorted_dates[-10:]]  # Letzte 10 Tage
-    }
+def _bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())  # Montag
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
 
 
-def calculate_current_streak(sorted_dates):
-    """Berechnet aktuelle aufeinanderfolgende Tage"""
-    from datetime import date, timedelta
+def _next_bucket(start, bucket):
+    if bucket == 'week':
+        return start + timedelta(days=7)
+    if bucket == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
 
-    if not sorted_dates:
-        return 0
 
-    current_streak = 0
-    current_date = date.today()
-
-    # Wenn der letzte Eintrag heute ist
-    if sorted_dates[-1] == current_date:
-        current_streak = 1
-        # Zähle zurück
-        check_date = current_date - timedelta(days=1)
-        for d in reversed(sorted_dates[:-1]):
-            if d == check_date:
-                current_streak += 1
-                check_date -= timedelta(days=1)
-            else:
-                break
-    # Wenn der letzte Eintrag gestern war
-    elif sorted_dates[-1] == current_date - timedelta(days=1):
-        current_streak = 1
-        check_date = current_date - timedelta(days=2)
-        for d in reversed(sorted_dates[:-1]):
-            if d == check_date:
-                current_streak += 1
-                check_date -= timedelta(days=1)
-            else:
-                break
+def activity_query(user_id, start, end):
+    """Einträge pro Tag zwischen start und end aus dem Rollup"""
+    return db.session.query(
+        UserActivityDay.day,
+        db.func.sum(UserActivityDay.count)
+    ).filter(
+        UserActivityDay.user_id == user_id,
+        UserActivityDay.day >= start,
+        UserActivityDay.day <= end
+    ).group_by(UserActivityDay.day)
+
+
+def activity_buckets(user_id, start, end, bucket='day'):
+    """Einträge pro Tag/Woche/Monat zwischen start und end - eine gruppierte Abfrage, Lücken mit 0"""
+    rows = activity_query(user_id, start, end).all()
 
-    return current_streak
+    totals = Counter()
+    for day, count in rows:
+        totals[_bucket_start(day, bucket)] += count
+
+    buckets = []
+    current = _bucket_start(start, bucket)
+    while current <= end:
+        buckets.append((current, totals[current]))
+        current = _next_bucket(current, bucket)
+    return buckets
 
 @app.post("/register")
 def register():
     data = request.get_json() or {}
-    print(f"Registrierungsdaten erhalten: {data}")
 
     email = (data.get("email") or "").strip().lower()
     password = data.get("password") or ""
     name = data.get("name") or ""
 
     if not email or not password:
-        print("Fehler: Email und Passwort werden benötigt")
         return jsonify({"error": "Email und Passwort werden benötigt"}), 400
 
     user = User.query.filter_by(email=email).first()
     if user:
-        print(f"Benutzer {email} existiert bereits")
         return jsonify({"error": "Benutzer existiert bereits"}), 400
 
-    pwd_hash = generate_password_hash(password, method="pbkdf2:sha256", salt_length=16)
+    pwd_hash = password_hasher.hash(password)
     new_user = User(email=email, name=name, hash_password=pwd_hash)  # Name wird gespeichert
     db.session.add(new_user)
     db.session.commit()
 
-    print(f"Benutzer erfolgreich erstellt: {email}")
+    logger.info("Benutzer erfolgreich erstellt: %s", new_user.id)
     return jsonify({
         "ok": True,
         "message": "Benutzer erfolgreich erstellt",
@@ -526,11 +1167,20 @@ def login():
     password = data.get("password") or ""
 
     user = User.query.filter_by(email=email).first()
-    if not user or not check_password_hash(user.hash_password, password):
+    if not user:
         return jsonify({"error": "Ungültige Anmeldedaten"}), 401
 
+    valid, new_hash = password_hasher.verify(user.hash_password, password)
+    if not valid:
+        return jsonify({"error": "Ungültige Anmeldedaten"}), 401
+    if new_hash:
+        # Hash-Parameter haben sich geändert - beim Login mit dem Klartext nachziehen
+        user.hash_password = new_hash
+        db.session.commit()
+
     access, access_payload = create_jwt(str(user.id), "access", ACCESS_TTL)
     refresh, refresh_payload = create_jwt(str(user.id), "refresh", REFRESH_TTL)
+    refresh_tokens.add(refresh_payload["jti"], user.id, refresh_payload["exp"])
 
     resp = make_response({
         "access_token": access,
@@ -557,54 +1207,230 @@ def login():
         max_age=REFRESH_TTL
     )
 
-    print(f"Login erfolgreich für {email}")
+    logger.info("Login erfolgreich für User %s", user.id)
     return resp
 
 
+WORKOUTS_MAX_LIMIT = 200
+
+
+WORKOUT_FIELDS = ('id', 'name', 'description', 'duration', 'difficulty', 'category')
+SUBSCRIPTION_FIELDS = WORKOUT_FIELDS + ('is_favorite', 'progress', 'subscribed_at')
+
+
+def serialize_workout(w, fields=None):
+    """Workout als Dict - mit fields nur diese Spalten, die übrigen sind evtl. gar nicht geladen"""
+    data = {field: getattr(w, field) for field in (WORKOUT_FIELDS if fields is None else fields)}
+    if 'description' in data:
+        data['description'] = data['description'] or ''
+    return data
+
+
+def workout_columns(fields):
+    """load_only für die angefragten Felder, damit z.B. description gar nicht erst gelesen wird"""
+    columns = [getattr(Workout, field) for field in fields if field in WORKOUT_FIELDS and field != 'id']
+    return load_only(Workout.id, *columns)
+
+
+def requested_fields(allowed=None):
+    """Sparse Fieldset aus ?fields=a,b oder (None, Fehlerantwort)"""
+    try:
+        return parse_fields(request.args.get('fields'), allowed), None
+    except ValueError as e:
+        return None, (jsonify({'error': str(e)}), 400)
+
+
 @app.route('/workouts', methods=['GET'])
+@read_only
 def get_workouts():
+    """Listet Workouts - mit limit/cursor als Keyset-Seite, sonst komplett (alte Clients)"""
     try:
-        print("🔍 /workouts Route aufgerufen")
+        category = request.args.get('category')
+        difficulty = request.args.get('difficulty')
+        min_duration = request.args.get('min_duration', type=int)
+        max_duration = request.args.get('max_duration', type=int)
+        limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor')
+        fields, error = requested_fields(WORKOUT_FIELDS)
+        if error:
+            return error
+
+        query = Workout.query
+        if fields:
+            query = query.options(workout_columns(fields))
+        if category:
+            query = query.filter(Workout.category == category)
+        if difficulty:
+            query = query.filter(Workout.difficulty == difficulty)
+        if min_duration is not None:
+            query = query.filter(Workout.duration >= min_duration)
+        if max_duration is not None:
+            query = query.filter(Workout.duration <= max_duration)
+
+        # Ohne Pagination-Parameter bleibt die alte Antwort (reine Liste)
+        if limit is None and cursor is None:
+            workouts = query.all()
+            return jsonify([serialize_workout(w, fields) for w in workouts])
+
+        if cursor:
+            try:
+                query = query.filter(Workout.id > int(cursor))
+            except ValueError:
+                return jsonify({'error': 'Ungültiger Cursor'}), 400
+
+        limit = max(1, min(50 if limit is None else limit, WORKOUTS_MAX_LIMIT))
+        # Eine Zeile mehr laden, um zu wissen ob es weitergeht
+        workouts = query.order_by(Workout.id).limit(limit + 1).all()
+        has_more = len(workouts) > limit
+        workouts = workouts[:limit]
+
+        return jsonify({
+            'workouts': [serialize_workout(w, fields) for w in workouts],
+            'next_cursor': str(workouts[-1].id) if has_more else None,
+            'has_more': has_more,
+            'limit': limit
+        })
+
+    except Exception as e:
+        logger.exception("Fehler in get_workouts")
+        return jsonify({'error': str(e)}), 500
 
+SEARCH_TOKEN = re.compile(r'\w+')
+SEARCH_MAX_OFFSET = 1000
+# Spalten-Gewichte für bm25 in der Reihenfolge des FTS-Index: name, description, category
+SEARCH_WEIGHTS = (10.0, 1.0, 5.0)
+workouts_fts = db.table('workouts_fts', db.column('rowid'))
 
-        workouts = Workout.query.all()
 
-        print(f"📊 Anzahl Workouts in DB: {len(workouts)}")
+def fts_query(text):
+    """Sucheingabe als FTS5-Query: alle Wörter müssen vorkommen, das letzte als Präfix"""
+    tokens = SEARCH_TOKEN.findall(text)
+    if not tokens:
+        return None
+    # In Anführungszeichen, damit Eingaben wie AND, NOT oder "-" keine FTS5-Syntax sind
+    return ' '.join(f'"{token}"' for token in tokens) + '*'
+
+
+def fts_search_query(text):
+    """SELECT über den FTS5-Index, nach bm25 sortiert (nur SQLite)"""
+    return select(Workout).join(workouts_fts, workouts_fts.c.rowid == Workout.id).where(
+        db.text('workouts_fts MATCH :match').bindparams(match=fts_query(text))
+    ).order_by(db.func.bm25(db.literal_column('workouts_fts'), *SEARCH_WEIGHTS), Workout.id)
+
+
+def like_pattern(token):
+    """%token% mit maskierten LIKE-Platzhaltern - sonst trifft z.B. "_" jede Zeile"""
+    escaped = token.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def like_search_query(text):
+    """SELECT ohne FTS-Index: jedes Wort muss in einer der Spalten vorkommen"""
+    conditions = []
+    for token in SEARCH_TOKEN.findall(text):
+        pattern = like_pattern(token)
+        conditions.append(db.or_(*[column.ilike(pattern, escape='\\')
+                                   for column in (Workout.name, Workout.description, Workout.category)]))
+    return select(Workout).where(*conditions).order_by(Workout.name, Workout.id)
 
-        # Erstelle JSON-Antwort
-        workout_list = []
-        for w in workouts:
-            workout_data = {
-                'id': w.id,
-                'name': w.name,
-                'description': w.description or '',
-                'duration': w.duration,
-                'difficulty': w.difficulty,
-                'category': w.category
-            }
-            workout_list.append(workout_data)
 
-        print(f"✅ Sende {len(workout_list)} Workouts als JSON")
-        return jsonify(workout_list)
+def search_workouts(text, difficulty=None, category=None, limit=20, offset=0, fields=None):
+    """Volltextsuche über name, description und category - unter SQLite per FTS5 nach bm25 sortiert"""
+    if db.engine.dialect.name == 'sqlite':
+        query = fts_search_query(text)
+    else:
+        query = like_search_query(text)
+
+    if difficulty:
+        query = query.where(Workout.difficulty == difficulty)
+    if category:
+        query = query.where(Workout.category == category)
+    if fields:
+        query = query.options(workout_columns(fields))
+    return db.session.scalars(query.limit(limit).offset(offset)).all()
+
+
+@app.route('/workouts/search', methods=['GET'])
+@read_only
+def search_workouts_route():
+    """Volltextsuche im Workout-Katalog (q, difficulty, category, limit, offset)"""
+    try:
+        text = request.args.get('q', '')
+        if not fts_query(text):
+            return jsonify({'error': 'q wird benötigt'}), 400
+
+        limit = max(1, min(request.args.get('limit', 20, type=int), WORKOUTS_MAX_LIMIT))
+        offset = request.args.get('offset', 0, type=int)
+        if not 0 <= offset <= SEARCH_MAX_OFFSET:
+            return jsonify({'error': f'offset muss zwischen 0 und {SEARCH_MAX_OFFSET} liegen'}), 400
+        fields, error = requested_fields(WORKOUT_FIELDS)
+        if error:
+            return error
+
+        workouts = search_workouts(text, request.args.get('difficulty'), request.args.get('category'),
+                                   limit + 1, offset, fields)
+        has_more = len(workouts) > limit
+        workouts = workouts[:limit]
+
+        return jsonify({
+            'workouts': [serialize_workout(w, fields) for w in workouts],
+            'next_offset': offset + limit if has_more else None,
+            'has_more': has_more,
+            'limit': limit
+        })
 
     except Exception as e:
-        print(f" Fehler: {str(e)}")
+        logger.exception("Fehler in search_workouts")
         return jsonify({'error': str(e)}), 500
 
+
+SUGGEST_MAX_LIMIT = 20
+
+
+@app.route('/workouts/suggest', methods=['GET'])
+def suggest_workouts():
+    """Typeahead: Namen, deren Name oder ein Wort mit q beginnt, nach Abonnenten sortiert"""
+    try:
+        ensure_suggest_index()
+        limit = max(1, min(request.args.get('limit', 10, type=int), SUGGEST_MAX_LIMIT))
+        return jsonify({'suggestions': suggest_index.suggest(request.args.get('q', ''), limit)})
+    except Exception as e:
+        logger.exception("Fehler in suggest_workouts")
+        return jsonify({'error': str(e)}), 500
+
+
+# Unter asgi.py holt der Event Loop die Exercises vorab und legt sie hier ins WSGI-Environ
+PREFETCHED_EXERCISES = 'mvp.prefetched_exercises'
+
+
+def provider_exercises(muscle, difficulty, type):
+    """Exercises für die Provider-Routen - vorab geholt (ASGI) oder synchron über den Cache"""
+    exercises = request.environ.get(PREFETCHED_EXERCISES)
+    if exercises is None:
+        return WorkoutService.fetch_exercises_from_api(muscle, difficulty, type)
+    index_suggest_names((exercise.get('name'), None) for exercise in exercises)
+    return exercises
+
+
 @app.route('/workouts/api', methods=['GET'])
 def get_exercises_from_api():
     try:
         muscle = request.args.get('muscle')
         difficulty = request.args.get('difficulty')
         type = request.args.get('type')
+        # Felder kommen von API Ninjas und werden deshalb nicht gegen eine feste Liste geprüft
+        fields, error = requested_fields()
+        if error:
+            return error
 
-        exercises = WorkoutService.fetch_exercises_from_api(muscle, difficulty, type)
-        saved_count = WorkoutService.save_exercises_to_db(exercises)
+        exercises = provider_exercises(muscle, difficulty, type)
+        import_result = WorkoutService.save_exercises_to_db(exercises)
 
         return jsonify({
-            'message': f'{saved_count} neue Exercises gespeichert',
+            'message': f'{import_result["inserted"]} neue Exercises gespeichert',
+            'import': import_result,
             'total_from_api': len(exercises),
-            'exercises': exercises[:10]
+            'exercises': [select_fields(exercise, fields) for exercise in exercises[:10]]
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -616,12 +1442,15 @@ def get_external_workouts():
         muscle = request.args.get('muscle')
         difficulty = request.args.get('difficulty')
         type = request.args.get('type')
+        fields, error = requested_fields()
+        if error:
+            return error
 
-        exercises = WorkoutService.fetch_exercises_from_api(muscle, difficulty, type)
+        exercises = provider_exercises(muscle, difficulty, type)
 
         return jsonify({
             'total_exercises': len(exercises),
-            'exercises': exercises
+            'exercises': [select_fields(exercise, fields) for exercise in exercises]
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -632,7 +1461,6 @@ def get_external_workouts():
 def subscribe_workout():
     try:
         data = request.get_json()
-        print(f"📥 Subscribe Request erhalten: {data}")
 
         user_id = data.get('user_id')
         workout_id = data.get('workout_id')
@@ -643,11 +1471,11 @@ def subscribe_workout():
         try:
             user_id = int(user_id)
             workout_id = int(workout_id)
-        except ValueError:
+        except (TypeError, ValueError):
             return jsonify({'error': 'IDs müssen Zahlen sein'}), 400
 
-        user = User.query.get(user_id)
-        workout = Workout.query.get(workout_id)
+        user = load_user(user_id)
+        workout = db.session.get(Workout, workout_id)
 
         if not user:
             return jsonify({'error': f'User mit ID {user_id} nicht gefunden'}), 404
@@ -655,23 +1483,27 @@ def subscribe_workout():
         if not workout:
             return jsonify({'error': f'Workout mit ID {workout_id} nicht gefunden'}), 404
 
-        if workout in user.subscribed_workouts:
+        if WorkoutService.is_subscribed(user_id, workout_id):
             return jsonify({'success': False, 'message': 'Workout bereits abonniert'}), 400
 
-        user.subscribed_workouts.append(workout)
-        db.session.commit()
+        workout_info = {'id': workout.id, 'name': workout.name}  # vor dem Commit, sonst lädt es neu
+        try:
+            db.session.execute(insert(user_workouts).values(user_id=user_id, workout_id=workout_id))
+            db.session.commit()
+        except IntegrityError:
+            # Ein paralleler Request hat dasselbe Abo zwischen Prüfung und INSERT angelegt
+            db.session.rollback()
+            return jsonify({'success': False, 'message': 'Workout bereits abonniert'}), 400
+        suggest_index.adjust_subscribers(workout_id, 1)
 
         return jsonify({
             'success': True,
             'message': 'Erfolgreich abonniert',
-            'workout': {
-                'id': workout.id,
-                'name': workout.name
-            }
+            'workout': workout_info
         })
 
     except Exception as e:
-        print(f"🔥 FEHLER in subscribe_workout: {str(e)}")
+        logger.exception("Fehler in subscribe_workout")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/workouts/unsubscribe', methods=['POST'])
@@ -684,50 +1516,130 @@ def unsubscribe_workout():
         if not user_id or not workout_id:
             return jsonify({'error': 'User ID und Workout ID benötigt'}), 400
 
+        try:
+            user_id = int(user_id)
+            workout_id = int(workout_id)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'IDs müssen Zahlen sein'}), 400
+
         success, message = WorkoutService.unsubscribe_user_from_workout(user_id, workout_id)
 
         return jsonify({'success': success, 'message': message})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+SUBSCRIPTION_BATCH_MAX = 500
+
+
+def _subscription_batch_args():
+    """(user_id, workout_ids) aus dem Request-Body oder (None, Fehlerantwort)"""
+    data = request.get_json(silent=True) or {}
+    try:
+        user_id = int(data.get('user_id'))
+        workout_ids = [int(workout_id) for workout_id in data.get('workout_ids')]
+    except (TypeError, ValueError):
+        return None, (jsonify({'error': 'user_id und workout_ids (Liste von Zahlen) benötigt'}), 400)
+
+    if not workout_ids:
+        return None, (jsonify({'error': 'workout_ids darf nicht leer sein'}), 400)
+    if len(workout_ids) > SUBSCRIPTION_BATCH_MAX:
+        return None, (jsonify({'error': f'Maximal {SUBSCRIPTION_BATCH_MAX} Workouts pro Request'}), 400)
+    if not load_user(user_id):
+        return None, (jsonify({'error': f'User mit ID {user_id} nicht gefunden'}), 404)
+    return (user_id, workout_ids), None
+
+
+@app.route('/workouts/subscribe/batch', methods=['POST'])
+def subscribe_workouts_batch():
+    """Abonniert mehrere Workouts auf einmal"""
+    try:
+        args, error = _subscription_batch_args()
+        if error:
+            return error
+
+        result = WorkoutService.subscribe_many(*args)
+        return jsonify({'success': True, **result})
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Fehler in subscribe_workouts_batch")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/workouts/unsubscribe/batch', methods=['POST'])
+def unsubscribe_workouts_batch():
+    """Entfernt mehrere Abonnements auf einmal"""
+    try:
+        args, error = _subscription_batch_args()
+        if error:
+            return error
+
+        result = WorkoutService.unsubscribe_many(*args)
+        return jsonify({'success': True, **result})
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Fehler in unsubscribe_workouts_batch")
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/user/<int:user_id>/workouts', methods=['GET'])
+@read_only
 def get_user_workouts(user_id):
+    """Abonnierte Workouts mit Favorit/Fortschritt - mit limit/cursor als Keyset-Seite"""
     try:
-        print(f"Lade Workout für User {user_id}")
-
-        user = User.query.get(user_id)
-        if not user:
-            print(f"User {user_id} nicht gefunden")
+        limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor')
+
+        after = None
+        if cursor:
+            # Cursor "<is_favorite>:<workout_id>" der letzten Zeile
+            try:
+                is_favorite, workout_id = cursor.split(':')
+                after = (is_favorite == '1', int(workout_id))
+            except ValueError:
+                return jsonify({'error': 'Ungültiger Cursor'}), 400
+        fields, error = requested_fields(SUBSCRIPTION_FIELDS)
+        if error:
+            return error
+
+        paged = limit is not None or cursor is not None
+        if paged:
+            limit = max(1, min(50 if limit is None else limit, WORKOUTS_MAX_LIMIT))
+
+        rows = WorkoutService.list_subscriptions(user_id, limit + 1 if paged else None, after, fields)
+        # Nur bei leerer Liste klären, ob es den User überhaupt gibt
+        if not rows and not cursor and not load_user(user_id):
             return jsonify({'error': 'User nicht gefunden'}), 404
-        else:
-            print(f"User {user_id} gefunden")
 
-        workouts = WorkoutService.get_user_workouts(user_id)
-        print(f"Gefundene Workouts: {len(workouts)}")
+        has_more = paged and len(rows) > limit
+        if paged:
+            rows = rows[:limit]
 
-        workout_list = [{
-            'id': w.id,
-            'name': w.name,
-            'description': w.description,
-            'duration': w.duration,
-            'difficulty': w.difficulty,
-            'category': w.category
-        } for w in workouts]
+        workout_fields = None if fields is None else [field for field in fields if field in WORKOUT_FIELDS]
+        workout_list = [select_fields({
+            **serialize_workout(workout, workout_fields),
+            'is_favorite': bool(is_favorite),
+            'progress': progress or 0,
+            'subscribed_at': created_at.isoformat() if created_at else None
+        }, fields) for workout, is_favorite, progress, created_at in rows]
 
-        return jsonify({
+        response = {
             'success': True,
             'workouts': workout_list,
-            'count': len(workouts)
-
-        })
+            'count': len(workout_list)
+        }
+        if paged:
+            last = rows[-1] if rows else None
+            response.update({
+                'next_cursor': f"{int(bool(last[1]))}:{last[0].id}" if has_more else None,
+                'has_more': has_more,
+                'limit': limit
+            })
+        return jsonify(response)
 
     except Exception as e:
-        print(f"Fehler in get_user_workouts: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
+        logger.exception("Fehler in get_user_workouts")
+        return jsonify({'error': str(e)}), 500
 
-        }), 500
 
 @app.route('/workouts', methods=['POST'])
 def create_workout():
@@ -742,6 +1654,7 @@ def create_workout():
         )
         db.session.add(workout)
         db.session.commit()
+        index_suggest_names([(workout.name, workout.id)])
         return jsonify({'message': 'Workout created!', 'id': workout.id}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -750,7 +1663,7 @@ def create_workout():
 def initialize_database():
     """Manuelle Datenbankinitialisierung"""
     with app.app_context():
-        db.create_all()  # Erstellt alle Tabellen inklusive streak_exercises
+        migrations.upgrade(db.engine, db.metadata)  # Erstellt/migriert alle Tabellen
 
         if Workout.query.count() == 0:
             sample_workouts = [
@@ -770,6 +1683,133 @@ def initialize_database():
         print(f" Streak-Tabelle hat {streak_count} Einträge")
 
 
+def query_plan_checks(user_id=1, workout_id=1):
+    """Die Abfragen der Hot Paths - gebaut von denselben Funktionen wie in den Routen - und ihre Indizes"""
+    today = date.today()
+    return [
+        ('POST /streaks: heute schon geloggt?',
+         logged_on_day_query(user_id, workout_id, today),
+         ('ix_streak_exercises_user_day', 'ix_streak_exercises_user_workout_ts')),
+        ('GET /streaks',
+         streak_entries_query(user_id, None, 50),
+         ('ix_streak_exercises_user_ts',)),
+        ('GET /streaks?workout_id=',
+         streak_entries_query(user_id, workout_id, 50),
+         ('ix_streak_exercises_user_workout_ts',)),
+        ('GET /streaks/activity',
+         activity_query(user_id, today - timedelta(days=365), today),
+         ('ix_user_activity_days_user_day',)),
+        ('GET /user/<id>/workouts',
+         WorkoutService.subscriptions_query(user_id, 51),
+         ('ix_user_workouts_user_favorite',)),
+    ]
+
+
+def explain_query_plan(query):
+    """Query-Plan einer ORM-Query oder eines select() (SQLite: EXPLAIN QUERY PLAN, PostgreSQL: EXPLAIN)"""
+    statement = getattr(query, 'statement', query)
+    sql = str(statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    with db.engine.connect() as conn:
+        if db.engine.dialect.name == 'sqlite':
+            return [row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql)]
+        # Auf kleinen Tabellen nimmt Postgres lieber einen Seq Scan - hier zählt, ob der Index nutzbar ist
+        conn.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        return [row[0] for row in conn.exec_driver_sql('EXPLAIN ' + sql)]
+
+
+def check_query_plans():
+    """Prüft, dass jede Hot-Path-Abfrage einen der erwarteten Indizes nutzt"""
+    failures = []
+    for name, query, indexes in query_plan_checks():
+        plan = explain_query_plan(query)
+        if not any(re.search(rf'\b{index}\b', line) for line in plan for index in indexes):
+            failures.append({'query': name, 'expected': indexes, 'plan': plan})
+    return failures
+
+
+@app.cli.command("db-upgrade")
+def db_upgrade_command():
+    """Wendet alle offenen Schema-Migrationen an (flask db-upgrade)"""
+    applied = migrations.upgrade(db.engine, db.metadata)
+    for version, description in applied:
+        print(f" Migration {version} angewendet: {description}")
+    print(f" Schema-Version: {migrations.current_version(db.engine)}")
+
+
+@app.cli.command("db-version")
+def db_version_command():
+    """Zeigt aktuelle und neueste Schema-Version (flask db-version)"""
+    print(f" Schema-Version: {migrations.current_version(db.engine)} "
+          f"(neueste: {migrations.latest_version()})")
+
+
+@app.cli.command("refresh-catalog")
+def refresh_catalog_command():
+    """Lädt den kompletten Exercise-Katalog von API Ninjas (flask refresh-catalog)"""
+    result = WorkoutService.refresh_catalog()
+    print(f" Katalog aktualisiert: {result}")
+
+
+@app.cli.command("backfill-activity-days")
+def backfill_activity_days_command():
+    """Füllt user_activity_days einmalig aus streak_exercises (flask backfill-activity-days)"""
+    rows = rebuild_activity_days()
+    print(f" user_activity_days neu aufgebaut: {rows} Tageszeilen")
+
+
+@app.cli.command("rebuild-streak-states")
+def rebuild_streak_states_command():
+    """Berechnet streak_states komplett neu (flask rebuild-streak-states)"""
+    rows = rebuild_streak_states()
+    print(f" streak_states neu aufgebaut: {rows} Zeilen")
+
+
+@app.cli.command("check-streaks")
+@click.option("--repair", is_flag=True, help="Abweichungen direkt korrigieren")
+def check_streaks_command(repair):
+    """Vergleicht streak_states mit einer vollen Neuberechnung (flask check-streaks)"""
+    mismatches = check_streak_states(repair=repair)
+    for mismatch in mismatches:
+        print(f" Abweichung: {mismatch}")
+    print(f" {len(mismatches)} Abweichungen{' korrigiert' if repair and mismatches else ''}")
+    if mismatches and not repair:
+        raise SystemExit(1)
+
+
+@app.cli.command("check-query-plans")
+def check_query_plans_command():
+    """Bricht ab, wenn eine Hot-Path-Abfrage keinen Index mehr nutzt (flask check-query-plans)"""
+    failures = check_query_plans()
+    for failure in failures:
+        print(f" Kein Index für '{failure['query']}': erwartet {failure['expected']}, Plan {failure['plan']}")
+    if failures:
+        raise SystemExit(1)
+    print(" Alle Abfragen nutzen ihre Indizes")
+
+
+def logged_on_day_query(user_id, workout_id, day):
+    """Einträge eines Users für ein Workout an einem Tag"""
+    return StreakExercise.query.filter(
+        StreakExercise.user_id == user_id,
+        StreakExercise.workout_id == workout_id,
+        StreakExercise.activity_day == day
+    )
+
+
+def streak_entries_query(user_id, workout_id=None, limit=50):
+    """Die neuesten Einträge eines Users, optional nur für ein Workout"""
+    # Workout-Namen gleich mitladen, sonst lädt to_dict() jedes Workout einzeln
+    query = StreakExercise.query.options(
+        joinedload(StreakExercise.workout).load_only(Workout.name)
+    ).filter_by(user_id=user_id)
+
+    if workout_id:
+        query = query.filter_by(workout_id=workout_id)
+
+    # Sortiere nach neuesten zuerst
+    return query.order_by(StreakExercise.timestamp.desc()).limit(limit)
+
+
 @app.route('/streaks', methods=['POST'])
 def add_streak():
     """Fügt einen Streak-Eintrag hinzu - mit Cookie-Fallback"""
@@ -785,7 +1825,7 @@ def add_streak():
             if user_id:
                 try:
                     user_id = int(user_id)
-                    print(f"⚠️ User ID aus Body (Fallback): {user_id}")
+                    logger.debug("User ID aus Body (Fallback): %s", user_id)
                 except:
                     return jsonify({'error': 'Ungültige User ID'}), 400
             else:
@@ -798,31 +1838,26 @@ def add_streak():
             return jsonify({'error': 'workout_id wird benötigt'}), 400
 
         # Prüfe ob Workout existiert
-        workout = Workout.query.get(workout_id)
+        workout = db.session.get(Workout, workout_id)
         if not workout:
             return jsonify({'error': 'Workout nicht gefunden'}), 404
 
         # Prüfe ob User existiert
-        user = User.query.get(user_id)
+        user = load_user(user_id)
         if not user:
             return jsonify({'error': 'User nicht gefunden'}), 404
 
-        # Optional: Prüfe ob abonniert
-        if workout not in user.subscribed_workouts:
+        # Nicht abonnierte Workouts werden nicht geloggt - POST /streaks/batch lehnt sie genauso ab
+        if not WorkoutService.is_subscribed(user_id, workout_id):
             return jsonify({
                 'warning': 'Workout nicht abonniert, aber trotzdem geloggt',
                 'subscribe_recommended': True
             })
 
         # Prüfe ob heute schon ein Eintrag existiert
-        from datetime import date
         today = date.today()
 
-        existing_today = StreakExercise.query.filter(
-            StreakExercise.user_id == user_id,
-            StreakExercise.workout_id == workout_id,
-            db.func.date(StreakExercise.timestamp) == today
-        ).first()
+        existing_today = logged_on_day_query(user_id, workout_id, today).first()
 
         if existing_today:
             return jsonify({
@@ -831,13 +1866,17 @@ def add_streak():
             }), 200
 
         # Neuen Streak-Eintrag
+        now = datetime.now()
         new_streak = StreakExercise(
             user_id=user_id,
             workout_id=workout_id,
-            timestamp=datetime.now()
+            timestamp=now,
+            activity_day=now.date()
         )
 
         db.session.add(new_streak)
+        record_activity(user_id, workout_id, new_streak.activity_day, 1)
+        update_streak_state_on_add(user_id, workout_id, new_streak.activity_day)
         db.session.commit()
 
         current_streak = calculate_streak_for_workout(user_id, workout_id)
@@ -850,12 +1889,146 @@ def add_streak():
         }), 201
 
     except Exception as e:
-        print(f"Fehler in add_streak: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Fehler in add_streak")
         return jsonify({'error': str(e)}), 500
 
+STREAK_BATCH_MAX_ENTRIES = 500
+
+
+def _parse_batch_entry(entry, today):
+    """(workout_id, timestamp) aus einem Batch-Eintrag oder ValueError mit Grund"""
+    if not isinstance(entry, dict):
+        raise ValueError('Eintrag muss ein Objekt sein')
+    try:
+        workout_id = int(entry.get('workout_id'))
+    except (TypeError, ValueError):
+        raise ValueError('workout_id fehlt oder ist keine Zahl')
+    try:
+        timestamp = datetime.fromisoformat(entry.get('timestamp'))
+    except (TypeError, ValueError):
+        raise ValueError('timestamp muss ISO 8601 sein')
+    if timestamp.tzinfo is not None:
+        # Gespeichert wird wie bei POST /streaks in lokaler Zeit ohne Zone
+        timestamp = timestamp.astimezone().replace(tzinfo=None)
+    if timestamp.date() > today:
+        raise ValueError('timestamp liegt in der Zukunft')
+    return workout_id, timestamp
+
+
+@app.route('/streaks/batch', methods=['POST'])
+@token_required
+def add_streaks_batch():
+    """Nachträgliches Loggen vieler Einträge (Offline-Sync) in einer Transaktion"""
+    try:
+        user_id = request.user_id  # Vom Decorator gesetzt
+
+        entries = (request.get_json(silent=True) or {}).get('entries')
+        if not isinstance(entries, list) or not entries:
+            return jsonify({'error': 'entries muss eine nicht-leere Liste sein'}), 400
+        if len(entries) > STREAK_BATCH_MAX_ENTRIES:
+            return jsonify({'error': f'Maximal {STREAK_BATCH_MAX_ENTRIES} Einträge pro Batch'}), 400
+
+        if not load_user(user_id):
+            return jsonify({'error': 'User nicht gefunden'}), 404
+
+        today = date.today()
+        rejected = []
+        parsed = []  # (Index, workout_id, timestamp) der formal gültigen Einträge
+        for index, entry in enumerate(entries):
+            try:
+                parsed.append((index, *_parse_batch_entry(entry, today)))
+            except ValueError as e:
+                rejected.append({'index': index, 'error': str(e)})
+
+        # Erst ablehnen, dann Duplikate suchen - sonst zählt die Wiederholung eines abgelehnten Eintrags als Duplikat
+        workout_ids = {workout_id for _, workout_id, _ in parsed}
+        known = set(db.session.scalars(select(Workout.id).where(Workout.id.in_(workout_ids)))) if workout_ids else set()
+        # Wie POST /streaks: nicht abonnierte Workouts werden nicht geloggt
+        subscribed = set(db.session.scalars(select(user_workouts.c.workout_id).where(
+            user_workouts.c.user_id == user_id, user_workouts.c.workout_id.in_(known)))) if known else set()
+        not_subscribed = sorted(known - subscribed)
+
+        candidates = {}  # (workout_id, Tag) -> (Index, timestamp); der früheste Eintrag pro Tag gewinnt
+        duplicates = []
+        for index, workout_id, timestamp in parsed:
+            if workout_id not in known:
+                rejected.append({'index': index, 'error': 'Workout nicht gefunden'})
+                continue
+            if workout_id not in subscribed:
+                rejected.append({'index': index, 'error': 'Workout nicht abonniert'})
+                continue
+            key = (workout_id, timestamp.date())
+            if key in candidates:
+                earlier_index, earlier = candidates[key]
+                if timestamp < earlier:
+                    candidates[key] = (index, timestamp)
+                    index = earlier_index
+                duplicates.append(index)
+            else:
+                candidates[key] = (index, timestamp)
+
+        if candidates:
+            days = [day for _, day in candidates]
+            # Schon geloggte Tage: eine Abfrage über ix_streak_exercises_user_day
+            existing = set(db.session.execute(
+                select(StreakExercise.workout_id, StreakExercise.activity_day).where(
+                    StreakExercise.user_id == user_id,
+                    StreakExercise.workout_id.in_(subscribed),
+                    StreakExercise.activity_day >= min(days),
+                    StreakExercise.activity_day <= max(days)
+                )
+            ).all())
+            for key in existing & candidates.keys():
+                duplicates.append(candidates.pop(key)[0])
+
+        if candidates:
+            now = datetime.now()
+            # Bulk-Insert umgeht das before_insert-Event - activity_day daher explizit setzen
+            db.session.execute(insert(StreakExercise), [
+                {'user_id': user_id, 'workout_id': workout_id, 'timestamp': timestamp,
+                 'activity_day': day, 'created_at': now}
+                for (workout_id, day), (_, timestamp) in candidates.items()
+            ])
+            # Jeder (workout, Tag) ist neu, also gibt es auch noch keine Rollup-Zeile dafür
+            db.session.execute(insert(UserActivityDay), [
+                {'user_id': user_id, 'workout_id': workout_id, 'day': day, 'count': 1}
+                for workout_id, day in candidates
+            ])
+
+            days_by_workout = defaultdict(list)
+            for workout_id, day in candidates:
+                days_by_workout[workout_id].append(day)
+            states = update_streak_states_bulk(user_id, days_by_workout)
+            # Vor dem Commit auslesen - danach wären die Zeilen expired und jede würde neu geladen
+            current = {workout_id: streaks.current_streak(row.last_day, row.current_run)
+                       for workout_id, row in states.items()}
+            db.session.commit()
+        else:
+            current = {ALL_WORKOUTS: calculate_streak_for_workout(user_id, ALL_WORKOUTS)}
+
+        return jsonify({
+            'success': True,
+            'created': len(candidates),
+            'duplicates': sorted(duplicates),
+            'rejected': sorted(rejected, key=lambda r: r['index']),
+            'not_subscribed': not_subscribed,
+            'streaks': {str(workout_id): streak for workout_id, streak in current.items()
+                        if workout_id != ALL_WORKOUTS},
+            'current_streak': current[ALL_WORKOUTS]
+        }), 201 if candidates else 200
+
+    except IntegrityError:
+        # Paralleler Sync hat dieselben Tage gerade eingetragen - erneutes Senden liefert sie als Duplikate
+        db.session.rollback()
+        return jsonify({'error': 'Einträge wurden gleichzeitig geloggt, bitte erneut senden'}), 409
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Fehler in add_streaks_batch")
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/streaks', methods=['GET'])
+@read_only
 def get_streaks():
     """Holt alle Streaks des aktuellen Users"""
     try:
@@ -867,22 +2040,21 @@ def get_streaks():
         workout_id = request.args.get('workout_id')
         limit = request.args.get('limit', 50, type=int)
 
-        query = StreakExercise.query.filter_by(user_id=user_id)
-
-        if workout_id:
-            query = query.filter_by(workout_id=workout_id)
+        entries = streak_entries_query(user_id, workout_id, limit).all()
 
-        # Sortiere nach neuesten zuerst
-        streaks = query.order_by(StreakExercise.timestamp.desc()).limit(limit).all()
+        # Alle Streak-Zustände des Users in einer Abfrage; die Gesamtzeile landet in der
+        # Identity Map, sodass get_streak_stats sie ohne weiteres SQL findet
+        states = {row.workout_id: row for row in StreakState.query.filter_by(user_id=user_id)}
 
         # Gruppiere nach Workout für bessere Übersicht
         streaks_by_workout = {}
-        for streak in streaks:
+        for streak in entries:
             if streak.workout_id not in streaks_by_workout:
+                state = states.get(streak.workout_id)
                 streaks_by_workout[streak.workout_id] = {
                     'workout_id': streak.workout_id,
                     'workout_name': streak.workout.name if streak.workout else 'Unbekannt',
-                    'current_streak': calculate_streak_for_workout(user_id, streak.workout_id),
+                    'current_streak': streaks.current_streak(state.last_day, state.current_run) if state else 0,
                     'total_entries': 0,
                     'entries': []
                 }
@@ -900,14 +2072,15 @@ def get_streaks():
             'success': True,
             'stats': stats,
             'workouts': workout_list,
-            'total_streaks': len(streaks)
+            'total_streaks': len(entries)
         })
 
     except Exception as e:
-        print(f"Fehler in get_streaks: {str(e)}")
+        logger.exception("Fehler in get_streaks")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/streaks/stats', methods=['GET'])
+@read_only
 def get_streak_stats_route():
     """Holt Streak-Statistiken"""
     try:
@@ -923,7 +2096,7 @@ def get_streak_stats_route():
         })
 
     except Exception as e:
-        print(f"Fehler in get_streak_stats: {str(e)}")
+        logger.exception("Fehler in get_streak_stats")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/streaks/<int:streak_id>', methods=['DELETE'])
@@ -943,6 +2116,8 @@ def delete_streak(streak_id):
             return jsonify({'error': 'Keine Berechtigung'}), 403
 
         db.session.delete(streak)
+        record_activity(streak.user_id, streak.workout_id, streak.activity_day, -1)
+        update_streak_state_on_delete(streak.user_id, streak.workout_id, streak.activity_day)
         db.session.commit()
 
         return jsonify({
@@ -951,7 +2126,7 @@ def delete_streak(streak_id):
         })
 
     except Exception as e:
-        print(f"Fehler in delete_streak: {str(e)}")
+        logger.exception("Fehler in delete_streak")
         return jsonify({'error': str(e)}), 500
 
 
@@ -965,8 +2140,6 @@ def refresh():
         if not refresh_token:
             return jsonify({'error': 'Refresh token fehlt'}), 401
 
-        print(f"🔄 Refresh Token erhalten: {refresh_token[:30]}...")
-
         try:
             # Refresh Token validieren
             payload = jwt.decode(refresh_token, JWT_SECRET, algorithms=["HS256"])
@@ -982,15 +2155,17 @@ def refresh():
             user_id = int(user_id_str)
 
             # Prüfe ob User existiert
-            user = User.query.get(user_id)
+            user = load_user(user_id)
             if not user:
                 return jsonify({'error': 'User nicht gefunden'}), 404
 
-            # Neuen Access Token erstellen
-            new_access, _ = create_jwt(str(user_id), "access", ACCESS_TTL)
-
-            # Optional: Neuen Refresh Token erstellen (Rotation)
+            # Rotation: alte jti verbrauchen, neue eintragen - schlägt fehl, wenn widerrufen
             new_refresh, new_refresh_payload = create_jwt(str(user_id), "refresh", REFRESH_TTL)
+            if not payload.get('jti') or not refresh_tokens.rotate(
+                    payload['jti'], user_id, new_refresh_payload['jti'], new_refresh_payload['exp']):
+                return jsonify({'error': 'Refresh token widerrufen, bitte neu anmelden'}), 401
+
+            new_access, _ = create_jwt(str(user_id), "access", ACCESS_TTL)
 
             resp = jsonify({
                 'access_token': new_access,
@@ -1009,7 +2184,6 @@ def refresh():
                 max_age=ACCESS_TTL
             )
 
-            # Optional: Refresh Token erneuern (Rotation)
             resp.set_cookie(
                 'refresh_token',
                 new_refresh,
@@ -1019,56 +2193,96 @@ def refresh():
                 max_age=REFRESH_TTL
             )
 
-            print(f"✅ Token erneuert für User {user_id}")
+            logger.info("Token erneuert für User %s", user_id)
             return resp
 
         except jwt.ExpiredSignatureError:
-            print("❌ Refresh Token abgelaufen")
             return jsonify({'error': 'Refresh token abgelaufen, bitte neu anmelden'}), 401
         except jwt.InvalidTokenError as e:
-            print(f"❌ Ungültiger Refresh Token: {e}")
+            logger.info("Ungültiger Refresh Token: %s", e)
             return jsonify({'error': 'Ungültiger refresh token'}), 401
 
     except Exception as e:
-        print(f"❌ Fehler in refresh: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Fehler in refresh")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.post('/logout')
+def logout():
+    """Widerruft den Refresh Token und löscht die Cookies"""
+    refresh_token = request.cookies.get('refresh_token')
+    if refresh_token:
+        try:
+            payload = jwt.decode(refresh_token, JWT_SECRET, algorithms=["HS256"])
+            if payload.get('jti'):
+                refresh_tokens.revoke(payload['jti'])
+        except jwt.InvalidTokenError:
+            pass  # Abgelaufen oder kaputt - es gibt nichts zu widerrufen
+
+    resp = jsonify({'ok': True})
+    resp.delete_cookie('access_token')
+    resp.delete_cookie('refresh_token')
+    return resp
+
+
+@app.route('/streaks/activity', methods=['GET'])
+@read_only
+@token_required
+def get_activity():
+    """Aktivität für einen Zeitraum, gruppiert nach Tag, Woche oder Monat"""
+    try:
+        user_id = request.user_id  # Vom Decorator gesetzt
+
+        bucket = request.args.get('bucket', 'day')
+        if bucket not in ACTIVITY_BUCKETS:
+            return jsonify({'error': f'bucket muss einer von {", ".join(ACTIVITY_BUCKETS)} sein'}), 400
+
+        try:
+            end = date.fromisoformat(request.args['to']) if request.args.get('to') else date.today()
+            start = date.fromisoformat(request.args['from']) if request.args.get('from') else end - timedelta(days=6)
+        except ValueError:
+            return jsonify({'error': 'from/to müssen im Format YYYY-MM-DD sein'}), 400
+
+        if start > end:
+            return jsonify({'error': 'from darf nicht nach to liegen'}), 400
+        if (end - start).days > ACTIVITY_MAX_DAYS:
+            return jsonify({'error': f'Zeitraum darf höchstens {ACTIVITY_MAX_DAYS} Tage umfassen'}), 400
+
+        buckets = activity_buckets(user_id, start, end, bucket)
+
+        return jsonify({
+            'success': True,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'bucket': bucket,
+            'buckets': [{'start': day.isoformat(), 'count': count} for day, count in buckets],
+            'total': sum(count for _, count in buckets)
+        })
+
+    except Exception as e:
+        logger.exception("Fehler in get_activity")
         return jsonify({'error': str(e)}), 500
 
 
 @app.route('/streaks/weekly', methods=['GET'])
+@read_only
 @token_required
 def get_weekly_stats():
-    """Gibt wöchentliche Aktivitätsdaten zurück"""
+    """Gibt wöchentliche Aktivitätsdaten zurück - die letzten 7 Tage aus activity_buckets"""
     try:
         user_id = request.user_id  # Vom Decorator gesetzt
-        from datetime import datetime, timedelta
-
-        print(f"📊 Lade wöchentliche Daten für User {user_id}")
-
-        # Letzte 7 Tage berechnen
-        weekly_data = []
-        for i in range(6, -1, -1):  # Von vor 6 Tagen bis heute
-            date = datetime.now() - timedelta(days=i)
-            date_str = date.strftime('%Y-%m-%d')
-
-            # Zähle Streaks an diesem Tag
-            count = StreakExercise.query.filter(
-                StreakExercise.user_id == user_id,
-                db.func.date(StreakExercise.timestamp) == date_str
-            ).count()
-
-            # Deutsche Wochentage
-            german_days = ['So', 'Mo', 'Di', 'Mi', 'Do', 'Fr', 'Sa']
-            day_name = german_days[date.weekday()]
-
-            weekly_data.append({
-                'day': day_name,
-                'full_day': date.strftime('%A'),
-                'date': date_str,
-                'count': count,
-                'is_today': i == 0
-            })
+
+        today = date.today()
+        # Deutsche Wochentage
+        german_days = ['So', 'Mo', 'Di', 'Mi', 'Do', 'Fr', 'Sa']
+
+        weekly_data = [{
+            'day': german_days[day.weekday()],
+            'full_day': day.strftime('%A'),
+            'date': day.isoformat(),
+            'count': count,
+            'is_today': day == today
+        } for day, count in activity_buckets(user_id, today - timedelta(days=6), today)]
 
         # Zusätzliche Statistiken
         total_this_week = sum(item['count'] for item in weekly_data)
@@ -1090,13 +2304,9 @@ def get_weekly_stats():
         })
 
     except Exception as e:
-        print(f"❌ Fehler in get_weekly_stats: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Fehler in get_weekly_stats")
         return jsonify({'error': str(e)}), 500
 
-    
-print(f"API_NINJAS_KEY: {API_NINJAS_KEY}")
 
 # Manuell aufrufen oder beim Start
 if __name__ == "__main__":
@@ -0,0 +1,197 @@
+"""ASGI-Einstiegspunkt: Provider-Routen asynchron, alle anderen Routen wie bisher.
+
+    uvicorn asgi:application --workers 2
+
+Unter WSGI blockiert /external-workouts bzw. /workouts/api einen Worker-Thread
+für den ganzen Aufruf bei API Ninjas (bis zu API_NINJAS_TIMEOUT pro Versuch).
+Hier holt der Event Loop die Exercises mit httpx über den Exercise-Cache -
+gleichzeitige Anfragen für dieselbe Kombination teilen sich einen Aufruf,
+API_NINJAS_DEADLINE begrenzt die Gesamtdauer, und legt der Client auf, wird
+der Upstream-Aufruf abgebrochen. Erst danach läuft die unveränderte Flask-View
+in einem Thread und findet die Exercises fertig im WSGI-Environ.
+
+Alle übrigen Routen (Datenbank, Auth, ...) laufen wie unter einem
+Thread-basierten WSGI-Server im Pool mit ASGI_WSGI_THREADS Threads.
+Request- und Response-Bodies werden dabei komplett gepuffert.
+"""
+import asyncio
+import io
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from app import (
+    app as flask_app, exercise_cache, observe_provider_call, PREFETCHED_EXERCISES,
+    API_NINJAS_KEY, API_NINJAS_TIMEOUT, API_NINJAS_DEADLINE, API_NINJAS_RETRIES,
+    API_NINJAS_MAX_CONCURRENCY, ASGI_WSGI_THREADS,
+)
+from exercise_cache import normalize_key, key_params
+from exercise_provider import AsyncExerciseProviderClient
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_ROUTES = {'/external-workouts', '/workouts/api'}
+
+wsgi_threads = ThreadPoolExecutor(max_workers=ASGI_WSGI_THREADS, thread_name_prefix='wsgi')
+provider = None  # httpx bindet sich an den Event Loop - Anlage erst beim ersten Request
+
+
+def get_provider():
+    global provider
+    if provider is None:
+        provider = AsyncExerciseProviderClient(
+            API_NINJAS_KEY,
+            timeout=API_NINJAS_TIMEOUT,
+            deadline=API_NINJAS_DEADLINE,
+            max_retries=API_NINJAS_RETRIES,
+            max_concurrency=API_NINJAS_MAX_CONCURRENCY,
+            observer=observe_provider_call,
+        )
+    return provider
+
+
+async def fetch_exercises(query):
+    """Gegenstück zu WorkoutService.fetch_exercises_from_api - Fehler ergeben wie dort eine leere Liste"""
+    key = normalize_key(*(query.get(name, [None])[0] for name in ('muscle', 'difficulty', 'type')))
+    muscle, difficulty, type = key_params(key)
+    client = get_provider()
+    try:
+        return await exercise_cache.aget_or_fetch(key, lambda: client.fetch_exercises(muscle, difficulty, type))
+    except Exception as e:
+        logger.warning("Error fetching from API: %s", e)
+        return []
+
+
+def _path_info(scope):
+    path, root_path = scope['path'], scope.get('root_path', '')
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    return path
+
+
+def _environ(scope, body):
+    """WSGI-Environ (PEP 3333) zu einem ASGI-HTTP-Scope"""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin1'),
+        'PATH_INFO': _path_info(scope).encode('utf-8').decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        key = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if key in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[key] = value
+            continue
+        key = 'HTTP_' + key
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _run_wsgi(environ):
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = headers
+
+    chunks = flask_app(environ, start_response)
+    try:
+        body = b''.join(chunks)
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    return response['status'], response['headers'], body
+
+
+async def _call_flask(scope, body, send, extra_environ=None):
+    environ = _environ(scope, body)
+    environ.update(extra_environ or {})
+    status, headers, body = await asyncio.get_running_loop().run_in_executor(wsgi_threads, _run_wsgi, environ)
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _read_body(receive):
+    """Kompletter Request-Body oder None, wenn der Client vorher auflegt"""
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def _provider_route(scope, receive, send):
+    fetch = asyncio.ensure_future(fetch_exercises(parse_qs(scope['query_string'].decode('latin1'))))
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    done = set()
+    try:
+        done, _ = await asyncio.wait({fetch, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        # Client weg oder Server fährt herunter: den Upstream-Aufruf nicht weiterlaufen lassen
+        if not fetch.done():
+            fetch.cancel()
+        disconnected.cancel()
+
+    if fetch not in done:
+        logger.info("Client hat vor der Antwort aufgelegt: %s", scope['path'])
+        return
+    await _call_flask(scope, b'', send, {PREFETCHED_EXERCISES: fetch.result()})
+
+
+async def _lifespan(receive, send):
+    global provider
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if provider is not None:
+                await provider.aclose()
+                provider = None
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        # Keine WebSockets
+        await send({'type': 'websocket.close'})
+        return
+
+    if scope['method'] in ('GET', 'HEAD') and _path_info(scope) in PROVIDER_ROUTES:
+        await _provider_route(scope, receive, send)
+        return
+
+    body = await _read_body(receive)
+    if body is not None:
+        await _call_flask(scope, body, send)
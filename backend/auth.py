@@ -0,0 +1,74 @@
+"""Token-Extraktion und -Prüfung mit einem Cache bereits verifizierter JWTs.
+
+Der Cache hält SHA-256-Digests erfolgreich geprüfter Tokens samt Payload und
+verwirft jeden Eintrag mit dem ``exp`` des Tokens. Ein pollendes Dashboard
+zahlt die HMAC-Prüfung so nur beim ersten Request mit einem Token.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+
+
+def extract_token(request):
+    """Token aus dem Authorization-Header (Bearer) oder dem access_token-Cookie"""
+    auth_header = request.headers.get('Authorization')
+    if auth_header and auth_header.startswith('Bearer '):
+        return auth_header.split(' ')[1]
+    return request.cookies.get('access_token')
+
+
+class VerifiedTokenCache:
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # digest -> payload
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        digest = self._digest(token)
+        with self._lock:
+            payload = self._entries.get(digest)
+            if payload is None:
+                return None
+            if payload['exp'] <= time.time():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return payload
+
+    def put(self, token, payload):
+        if 'exp' not in payload:
+            return  # Tokens ohne Ablauf nicht cachen
+        digest = self._digest(token)
+        with self._lock:
+            self._entries[digest] = payload
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def verify_token(token, secret, cache=None):
+    """Dekodiert und prüft ein HS256-Token, bei Cache-Treffer ohne erneute Signaturprüfung.
+
+    Wirft jwt.ExpiredSignatureError bzw. jwt.InvalidTokenError wie jwt.decode.
+    """
+    if cache is not None:
+        payload = cache.get(token)
+        if payload is not None:
+            return payload
+        # Abgelaufene Tokens sind aus dem Cache gefallen - jwt.decode liefert den passenden Fehler
+
+    payload = jwt.decode(token, secret, algorithms=["HS256"])
+    if cache is not None:
+        cache.put(token, payload)
+    return payload
@@ -0,0 +1,220 @@
+"""Benchmark-Harness für Streak-Berechnung und HTTP-Endpoints.
+
+    python generate_data.py --users 1000 --days 730
+    python benchmark.py --output bench-$(git rev-parse --short HEAD).json
+    python benchmark.py --compare bench-abc123.json
+
+Teil 1 misst get_streak_stats, calculate_streak_for_workout und
+save_exercises_to_db direkt; Teil 2 schickt Requests über den Flask-Test-Client
+(optional parallel). Ergebnisse gehen als JSON nach stdout oder --output.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+# Access- und Login-Logs würden die Messung verfälschen
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from app import (app, db, create_jwt, User, StreakState, WorkoutService,
+                 get_streak_stats, calculate_streak_for_workout, ALL_WORKOUTS)
+from generate_data import BENCH_PASSWORD, BENCH_EMAIL
+
+
+def summarize(samples):
+    """Kennzahlen in Millisekunden"""
+    ordered = sorted(samples)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+
+    return {
+        'n': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'p50_ms': round(pct(50), 3),
+        'p95_ms': round(pct(95), 3),
+        'p99_ms': round(pct(99), 3),
+        'min_ms': round(ordered[0] * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+def timed(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+@contextmanager
+def rolled_back():
+    """db.session in einer äußeren Transaktion, die am Ende zurückgerollt wird.
+
+    commit() in der App gibt dabei nur Savepoints frei - schreibende Benchmarks
+    lassen die Bench-Datenbank unverändert, spätere Läufe messen dieselben Daten.
+    """
+    db.session.remove()
+    with db.engine.connect() as connection:
+        driver_connection = connection.connection.driver_connection
+        sqlite = connection.dialect.name == "sqlite"
+        if sqlite:
+            # pysqlite sendet BEGIN erst vor dem ersten DML und committet Savepoints sonst direkt
+            isolation_level = driver_connection.isolation_level
+            driver_connection.isolation_level = None
+        transaction = connection.begin()
+        if sqlite:
+            connection.exec_driver_sql("BEGIN")
+        session = Session(bind=connection, join_transaction_mode="create_savepoint")
+        db.session.registry.set(session)
+        try:
+            yield
+        finally:
+            session.close()
+            transaction.rollback()
+            if sqlite:
+                driver_connection.isolation_level = isolation_level
+            db.session.remove()
+
+
+def pick_users(count, rng):
+    """Bench-User mit möglichst vielen Einträgen - die teuren Fälle"""
+    rows = StreakState.query.filter(
+        StreakState.workout_id == ALL_WORKOUTS,
+        User.email.like(BENCH_EMAIL.format('%'))
+    ).join(User, User.id == StreakState.user_id).order_by(StreakState.total_entries.desc()).limit(count * 4).all()
+    if not rows:
+        raise SystemExit("Keine Bench-User gefunden - zuerst generate_data.py ausführen")
+    rng.shuffle(rows)
+    return [row.user_id for row in rows[:count]]
+
+
+def micro_benchmarks(user_ids, iterations):
+    results = {}
+    results['get_streak_stats'] = timed(
+        lambda: [get_streak_stats(user_id) for user_id in user_ids], iterations)
+
+    pairs = [(row.user_id, row.workout_id) for row in StreakState.query.filter(
+        StreakState.user_id.in_(user_ids), StreakState.workout_id != ALL_WORKOUTS)]
+    results['calculate_streak_for_workout'] = timed(
+        lambda: [calculate_streak_for_workout(user_id, workout_id) for user_id, workout_id in pairs], iterations)
+
+    # Erst der Insert-Pfad, dann derselbe Import komplett übersprungen - alles wird zurückgerollt
+    # (commit ist hier nur ein Savepoint, das fsync fehlt also in der Messung)
+    run = uuid.uuid4().hex[:8]
+    exercises = [{'name': f"bench-{run}-{i}", 'type': 'strength', 'difficulty': 'beginner',
+                  'instructions': 'Synthetische Übung'} for i in range(2000)]
+    with rolled_back():
+        results['save_exercises_to_db_insert_2000'] = timed(lambda: WorkoutService.save_exercises_to_db(exercises), 1)
+        results['save_exercises_to_db_skip_2000'] = timed(
+            lambda: WorkoutService.save_exercises_to_db(exercises), iterations)
+    return results
+
+
+def http_benchmarks(user_ids, requests_per_endpoint, concurrency):
+    tokens = {user_id: create_jwt(str(user_id), "access", 3600)[0] for user_id in user_ids}
+    endpoints = {
+        'GET /streaks': lambda client, user_id: client.get(
+            '/streaks', headers={'Authorization': f'Bearer {tokens[user_id]}'}),
+        'GET /streaks/weekly': lambda client, user_id: client.get(
+            '/streaks/weekly', headers={'Authorization': f'Bearer {tokens[user_id]}'}),
+        'GET /workouts?limit=50': lambda client, user_id: client.get('/workouts?limit=50'),
+        'GET /workouts (legacy)': lambda client, user_id: client.get('/workouts'),
+        'GET /workouts/search': lambda client, user_id: client.get('/workouts/search?q=bench&limit=20'),
+        'POST /login': lambda client, user_id: client.post(
+            '/login', json={'email': BENCH_EMAIL.format(user_id), 'password': BENCH_PASSWORD}),
+    }
+
+    results = {}
+    for name, call in endpoints.items():
+        def worker(worker_index):
+            client = app.test_client()
+            samples, errors = [], 0
+            for i in range(worker_index, requests_per_endpoint, concurrency):
+                started = time.perf_counter()
+                response = call(client, user_ids[i % len(user_ids)])
+                samples.append(time.perf_counter() - started)
+                errors += response.status_code >= 400
+            return samples, errors
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(worker, range(concurrency)))
+        wall = time.perf_counter() - started
+
+        samples = [sample for worker_samples, _ in outcomes for sample in worker_samples]
+        results[name] = {
+            **summarize(samples),
+            'errors': sum(errors for _, errors in outcomes),
+            'requests_per_s': round(len(samples) / wall, 1),
+        }
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old, new):
+    """Druckt die p50-Änderung je Messung gegenüber einem früheren Ergebnis"""
+    for section in ('micro', 'http'):
+        for name, result in new.get(section, {}).items():
+            before = old.get(section, {}).get(name)
+            if not before or not before['p50_ms']:
+                continue
+            change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100
+            print(f" {section:5} {name:40} {before['p50_ms']:>10.3f} -> {result['p50_ms']:>10.3f} ms ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20, help="Anzahl Bench-User pro Messung")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200, help="Requests pro Endpoint")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON-Datei statt stdout")
+    parser.add_argument("--compare", help="früheres Ergebnis zum Vergleichen")
+    args = parser.parse_args()
+
+    with app.app_context():
+        user_ids = pick_users(args.users, random.Random(args.seed))
+        result = {
+            'commit': git_commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'database': db.engine.url.render_as_string(hide_password=True),
+            'params': vars(args),
+            'micro': micro_benchmarks(user_ids, args.iterations),
+        }
+    result['http'] = http_benchmarks(user_ids, args.requests, args.concurrency)
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Datenbank-URI und Pool-Einstellungen aus der Umgebung.
+
+Standard ist weiterhin ``sqlite:///profiles.db``; mit ``DATABASE_URL`` läuft
+die App gegen PostgreSQL (Treiber: psycopg2 bzw. ``postgresql+psycopg://``
+für psycopg 3). Die Pool-Werte gelten pro Worker-Prozess - bei N Workern
+braucht die Datenbank N * (pool_size + max_overflow) Verbindungen.
+"""
+from sqlalchemy.engine import make_url
+
+DEFAULT_DATABASE_URL = "sqlite:///profiles.db"
+
+
+def database_uri(raw=None):
+    """Normalisiert DATABASE_URL; Heroku & Co. liefern noch das alte Schema postgres://"""
+    uri = raw or DEFAULT_DATABASE_URL
+    if uri.startswith("postgres://"):
+        uri = "postgresql://" + uri[len("postgres://"):]
+    return uri
+
+
+def is_sqlite(uri):
+    return make_url(uri).get_backend_name() == "sqlite"
+
+
+def engine_options(uri, pool_size=10, max_overflow=20, pool_timeout=10, pre_ping=True, recycle=1800):
+    """SQLALCHEMY_ENGINE_OPTIONS für Haupt- und Read-Engine.
+
+    pre_ping prüft eine Verbindung vor der Ausgabe aus dem Pool (übersteht
+    Server-Neustarts und Failover), recycle ersetzt Verbindungen, bevor
+    Server oder PgBouncer sie wegen Idle-Timeouts schließen. Bei SQLite
+    hält ein fester Pool die Page-Caches der Verbindungen warm.
+    """
+    options = {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": pool_timeout,
+    }
+    if is_sqlite(uri):
+        # Eine lokale Datei bricht nicht weg - Ping und Recycle kosten nur
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options["pool_pre_ping"] = pre_ping
+        options["pool_recycle"] = recycle
+    return options
@@ -0,0 +1,245 @@
+"""Zweistufiger Cache für Exercise-Abfragen bei API Ninjas.
+
+Stufe 1 ist ein LRU im Prozess, Stufe 2 eine SQLite-Datei, die Neustarts
+überlebt. Einträge sind bis ``ttl`` frisch, danach bis ``ttl + stale_ttl``
+"stale": sie werden sofort ausgeliefert und im Hintergrund erneuert
+(stale-while-revalidate). Fällt der Upstream aus, wird notfalls auch eine
+ältere Kopie geliefert. Gleichzeitige Misses auf denselben Schlüssel teilen
+sich einen Upstream-Aufruf (single-flight), statt API Ninjas zu stürmen.
+
+``aget_or_fetch`` ist die Variante für den Event Loop (asgi.py).
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_key(muscle=None, difficulty=None, type=None):
+    """Normalisiert (muscle, difficulty, type) zu einem stabilen Cache-Schlüssel"""
+    return "|".join((value or "").strip().lower() for value in (muscle, difficulty, type))
+
+
+def key_params(key):
+    """(muscle, difficulty, type) eines Schlüssels - so, wie sie auch an den Upstream gehen"""
+    return tuple(value or None for value in key.split("|"))
+
+
+class ExerciseCache:
+    def __init__(self, path, ttl=6 * 3600, stale_ttl=7 * 24 * 3600, max_entries=512):
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+
+        self._lru = OrderedDict()  # key -> (payload, fetched_at)
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._loading = {}  # key -> Future des laufenden Upstream-Aufrufs
+        self._inflight = {}  # key -> [Task, Anzahl Wartende]; nur aus dem Event Loop benutzt
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS exercise_cache ("
+                " key TEXT PRIMARY KEY,"
+                " payload TEXT NOT NULL,"
+                " fetched_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        """Eine SQLite-Verbindung pro Thread (sqlite3-Objekte sind nicht thread-safe)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key, payload, fetched_at):
+        with self._lock:
+            self._lru[key] = (payload, fetched_at)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def get(self, key):
+        """Liefert (payload, fetched_at) oder None - zuerst aus dem LRU, dann aus SQLite"""
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                self._lru.move_to_end(key)
+                return entry
+
+        try:
+            row = self._connect().execute(
+                "SELECT payload, fetched_at FROM exercise_cache WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Exercise-Cache nicht lesbar: %s", e)
+            return None
+
+        if row is None:
+            return None
+
+        entry = (json.loads(row[0]), row[1])
+        self._remember(key, *entry)
+        return entry
+
+    def set(self, key, payload, fetched_at=None):
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        self._remember(key, payload, fetched_at)
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO exercise_cache (key, payload, fetched_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(payload), fetched_at),
+                )
+        except sqlite3.Error as e:
+            logger.warning("Exercise-Cache nicht schreibbar: %s", e)
+
+    def payloads(self):
+        """Alle Payloads aus SQLite - z.B. um einen Index über die gecachten Namen aufzubauen"""
+        try:
+            rows = self._connect().execute("SELECT payload FROM exercise_cache").fetchall()
+        except sqlite3.Error as e:
+            logger.warning("Exercise-Cache nicht lesbar: %s", e)
+            return []
+        return [json.loads(row[0]) for row in rows]
+
+    def invalidate(self, key=None):
+        """Entfernt einen Schlüssel oder (ohne Argument) den kompletten Cache"""
+        with self._lock:
+            if key is None:
+                self._lru.clear()
+            else:
+                self._lru.pop(key, None)
+        with self._connect() as conn:
+            if key is None:
+                conn.execute("DELETE FROM exercise_cache")
+            else:
+                conn.execute("DELETE FROM exercise_cache WHERE key = ?", (key,))
+
+    def get_or_fetch(self, key, loader):
+        """Liefert den Cache-Eintrag für key und ruft loader() nur bei Bedarf auf.
+
+        loader muss bei Upstream-Fehlern eine Exception werfen, damit keine
+        Fehlerantworten im Cache landen.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            payload, fetched_at = entry
+            age = time.time() - fetched_at
+            if age < self.ttl:
+                return payload
+            if age < self.ttl + self.stale_ttl:
+                self._refresh_in_background(key, loader)
+                return payload
+
+        try:
+            return self._load_once(key, loader)
+        except Exception:
+            if entry is not None:
+                # Upstream langsam oder down: lieber alte Daten als gar keine
+                return entry[0]
+            raise
+
+    def _load_once(self, key, loader):
+        """Ruft loader() pro Schlüssel nur einmal gleichzeitig auf; andere Threads warten auf dasselbe Ergebnis"""
+        with self._lock:
+            future = self._loading.get(key)
+            leader = future is None
+            if leader:
+                future = self._loading[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            payload = loader()
+            self.set(key, payload)
+            future.set_result(payload)
+            return payload
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._loading[key]
+
+    def _refresh_in_background(self, key, loader):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self.set(key, loader())
+            except Exception as e:
+                logger.warning("Hintergrund-Refresh für '%s' fehlgeschlagen: %s", key, e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name=f"exercise-cache-refresh:{key}", daemon=True).start()
+
+    async def aget_or_fetch(self, key, loader):
+        """Wie get_or_fetch, aber loader ist eine Coroutine-Funktion.
+
+        Wird der letzte Wartende abgebrochen (z.B. weil der Client aufgelegt
+        hat), wird auch der Upstream-Aufruf abgebrochen.
+        """
+        entry = await asyncio.to_thread(self.get, key)
+        if entry is not None:
+            payload, fetched_at = entry
+            age = time.time() - fetched_at
+            if age < self.ttl:
+                return payload
+            if age < self.ttl + self.stale_ttl:
+                self._start_fetch(key, loader)
+                return payload
+
+        fetch = self._start_fetch(key, loader)
+        fetch[1] += 1
+        try:
+            return await asyncio.shield(fetch[0])
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            if entry is not None:
+                return entry[0]
+            raise
+        finally:
+            fetch[1] -= 1
+            if fetch[1] == 0 and not fetch[0].done():
+                fetch[0].cancel()
+
+    def _start_fetch(self, key, loader):
+        fetch = self._inflight.get(key)
+        if fetch is not None and not fetch[0].done():
+            return fetch
+
+        async def load():
+            payload = await loader()
+            await asyncio.to_thread(self.set, key, payload)
+            return payload
+
+        fetch = self._inflight[key] = [asyncio.ensure_future(load()), 0]
+        fetch[0].add_done_callback(lambda task: self._fetch_done(key, fetch, task))
+        return fetch
+
+    def _fetch_done(self, key, fetch, task):
+        if self._inflight.get(key) is fetch:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None and fetch[1] == 0:
+            # Niemand wartet mehr (Stale-Refresh) - sonst meldet der Aufrufer den Fehler
+            logger.warning("Hintergrund-Refresh für '%s' fehlgeschlagen: %s", key, task.exception())
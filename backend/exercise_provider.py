@@ -0,0 +1,262 @@
+"""HTTP-Client für den Exercise-Provider (API Ninjas).
+
+Eine gemeinsame requests.Session hält Keep-Alive-Verbindungen im Pool,
+fehlgeschlagene Aufrufe werden mit exponentiellem Backoff plus Jitter
+wiederholt und ein Semaphor pro Host begrenzt die parallelen Requests. Eine
+Deadline begrenzt die Gesamtdauer über alle Versuche hinweg.
+``fetch_many`` verteilt viele muscle/type-Kombinationen auf einen Threadpool.
+
+``AsyncExerciseProviderClient`` ist das Gegenstück für den ASGI-Betrieb
+(siehe asgi.py): gleiche Retries und Host-Limits, aber auf httpx und asyncio,
+sodass wartende Upstream-Aufrufe keinen Thread belegen.
+"""
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+API_NINJAS_EXERCISES_URL = "https://api.api-ninjas.com/v1/exercises"
+
+MUSCLES = [
+    "abdominals", "abductors", "adductors", "biceps", "calves", "chest",
+    "forearms", "glutes", "hamstrings", "lats", "lower_back", "middle_back",
+    "neck", "quadriceps", "traps", "triceps",
+]
+EXERCISE_TYPES = [
+    "cardio", "olympic_weightlifting", "plyometrics", "powerlifting",
+    "strength", "stretching", "strongman",
+]
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def backoff_delay(attempt, base, maximum):
+    """Exponentielles Backoff mit "full jitter"""
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+
+class ProviderError(Exception):
+    """Der Provider war nicht erreichbar oder hat einen Fehler geliefert"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ExerciseProviderClient:
+    def __init__(self, api_key, url=API_NINJAS_EXERCISES_URL, timeout=10, deadline=15, max_retries=3,
+                 backoff_base=0.5, backoff_max=8.0, max_concurrency=4, pool_size=10, observer=None):
+        self.url = url
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_concurrency = max_concurrency
+        # observer(seconds, outcome) wird nach jedem Versuch aufgerufen; outcome ist
+        # der HTTP-Status als String oder "error" bei Verbindungsfehlern
+        self.observer = observer
+
+        self.session = requests.Session()
+        self.session.headers["X-Api-Key"] = api_key
+        # Retries machen wir selbst, damit Backoff und Host-Limit zusammenpassen
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._host_limits = {}
+        self._host_limits_lock = threading.Lock()
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc
+        with self._host_limits_lock:
+            limit = self._host_limits.get(host)
+            if limit is None:
+                limit = self._host_limits[host] = threading.BoundedSemaphore(self.max_concurrency)
+            return limit
+
+    def _backoff(self, attempt):
+        return backoff_delay(attempt, self.backoff_base, self.backoff_max)
+
+    @staticmethod
+    def build_params(muscle=None, difficulty=None, type=None):
+        params = {}
+        if muscle:
+            params["muscle"] = muscle
+        if difficulty:
+            params["difficulty"] = difficulty.lower()
+        if type:
+            params["type"] = type
+        return params
+
+    def fetch_exercises(self, muscle=None, difficulty=None, type=None):
+        """Holt Exercises für eine Kombination und wirft ProviderError bei Fehlern"""
+        return self.get_json(self.build_params(muscle, difficulty, type))
+
+    def get_json(self, params, deadline=None):
+        """Ruft den Provider mit Retries auf; nach deadline Sekunden (alle Versuche) wird aufgegeben.
+
+        Jeder Fehler - Verbindung, Timeout, HTTP-Status, kaputtes JSON - kommt als ProviderError.
+        """
+        give_up_at = time.monotonic() + (self.deadline if deadline is None else deadline)
+        last_error = ProviderError("Deadline für den Provider überschritten")
+        limit = self._host_limit(self.url)
+
+        for attempt in range(self.max_retries + 1):
+            remaining = give_up_at - time.monotonic()
+            if remaining <= 0 or not limit.acquire(timeout=remaining):
+                break
+            started = time.perf_counter()
+            try:
+                response = self.session.get(
+                    self.url, params=params, timeout=min(self.timeout, max(give_up_at - time.monotonic(), 0.001)))
+            except requests.RequestException as e:
+                response = None
+                last_error = ProviderError(f"Provider nicht erreichbar: {e}")
+            finally:
+                limit.release()
+                elapsed = time.perf_counter() - started
+
+            if response is None:
+                self._observe(elapsed, "error")
+            else:
+                self._observe(elapsed, str(response.status_code))
+                if response.status_code == 200:
+                    try:
+                        return response.json()
+                    except ValueError as e:
+                        raise ProviderError(f"Ungültige Antwort vom Provider: {e}", status_code=200)
+
+                last_error = ProviderError(
+                    f"API Error: {response.status_code} - {response.text}",
+                    status_code=response.status_code,
+                )
+                if response.status_code not in RETRY_STATUSES:
+                    raise last_error
+
+            if attempt < self.max_retries:
+                delay = min(self._backoff(attempt), give_up_at - time.monotonic())
+                if delay > 0:
+                    time.sleep(delay)
+
+        raise last_error
+
+    def _observe(self, seconds, outcome):
+        if self.observer is not None:
+            self.observer(seconds, outcome)
+
+    def fetch_many(self, combinations, max_workers=None):
+        """Holt viele Kombinationen parallel.
+
+        combinations ist eine Liste von Dicts mit den Schlüsseln muscle,
+        difficulty und type. Zurück kommt eine Liste von
+        (combination, exercises, error) in derselben Reihenfolge; bei Fehlern
+        ist exercises None.
+        """
+        combinations = list(combinations)
+        if not combinations:
+            return []
+
+        def fetch(combination):
+            try:
+                return combination, self.fetch_exercises(**combination), None
+            except ProviderError as e:
+                return combination, None, e
+
+        # Das Host-Limit drosselt ohnehin; mehr Threads als Slots bringen nichts
+        workers = max_workers or self.max_concurrency
+        with ThreadPoolExecutor(max_workers=min(workers, len(combinations)),
+                                thread_name_prefix="exercise-provider") as pool:
+            return list(pool.map(fetch, combinations))
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncExerciseProviderClient:
+    """Async-Client für API Ninjas; muss im Event Loop erzeugt und mit aclose() geschlossen werden"""
+
+    def __init__(self, api_key, url=API_NINJAS_EXERCISES_URL, timeout=10, deadline=15, max_retries=3,
+                 backoff_base=0.5, backoff_max=8.0, max_concurrency=4, pool_size=100, observer=None):
+        if httpx is None:
+            raise RuntimeError("Für den Async-Betrieb wird httpx benötigt (pip install httpx)")
+        self.url = url
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.observer = observer
+
+        self.client = httpx.AsyncClient(
+            headers={"X-Api-Key": api_key},
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=max_concurrency),
+        )
+        # Ein Loop, ein Host - ein Semaphor reicht; Wartende belegen keinen Thread
+        self._limit = asyncio.Semaphore(max_concurrency)
+
+    async def fetch_exercises(self, muscle=None, difficulty=None, type=None):
+        """Holt Exercises für eine Kombination und wirft ProviderError bei Fehlern"""
+        return await self.get_json(ExerciseProviderClient.build_params(muscle, difficulty, type))
+
+    async def get_json(self, params, deadline=None):
+        """Wie ExerciseProviderClient.get_json; nach deadline Sekunden wird abgebrochen.
+
+        Ein Abbruch von außen (Task.cancel) beendet auch den laufenden HTTP-Request.
+        """
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + (self.deadline if deadline is None else deadline)
+        last_error = ProviderError("Deadline für den Provider überschritten")
+
+        for attempt in range(self.max_retries + 1):
+            remaining = give_up_at - loop.time()
+            if remaining <= 0:
+                break
+            started = time.perf_counter()
+            try:
+                async with asyncio.timeout(remaining):
+                    async with self._limit:
+                        started = time.perf_counter()
+                        response = await self.client.get(
+                            self.url, params=params, timeout=min(self.timeout, give_up_at - loop.time()))
+            except (httpx.TransportError, TimeoutError) as e:
+                self._observe(time.perf_counter() - started, "error")
+                last_error = ProviderError(f"Provider nicht erreichbar: {str(e) or 'Deadline überschritten'}")
+            else:
+                self._observe(time.perf_counter() - started, str(response.status_code))
+                if response.status_code == 200:
+                    try:
+                        return response.json()
+                    except ValueError as e:
+                        raise ProviderError(f"Ungültige Antwort vom Provider: {e}", status_code=200)
+
+                last_error = ProviderError(
+                    f"API Error: {response.status_code} - {response.text}",
+                    status_code=response.status_code,
+                )
+                if response.status_code not in RETRY_STATUSES:
+                    raise last_error
+
+            if attempt < self.max_retries:
+                delay = min(backoff_delay(attempt, self.backoff_base, self.backoff_max), give_up_at - loop.time())
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+        raise last_error
+
+    def _observe(self, seconds, outcome):
+        if self.observer is not None:
+            self.observer(seconds, outcome)
+
+    async def aclose(self):
+        await self.client.aclose()
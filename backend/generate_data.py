@@ -0,0 +1,141 @@
+"""Erzeugt reproduzierbare Testdaten für Benchmarks.
+
+    python generate_data.py --users 1000 --workouts 500 --days 730 --seed 42
+
+Schreibt in die Datenbank der App (profiles.db bzw. SQLALCHEMY_DATABASE_URI).
+Alle erzeugten User heißen bench-user-<n>@example.com und haben das Passwort
+BENCH_PASSWORD, damit benchmark.py sich einloggen kann. Die Aktivität folgt
+einer Markov-Kette pro User: wer gestern trainiert hat, trainiert heute mit
+höherer Wahrscheinlichkeit - so entstehen realistische Streaks und Pausen.
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert, text
+from werkzeug.security import generate_password_hash
+
+from app import (app, db, migrations, User, Workout, StreakExercise, user_workouts,
+                 rebuild_activity_days, rebuild_streak_states)
+
+BENCH_PASSWORD = "benchmark"
+BENCH_EMAIL = "bench-user-{}@example.com"
+DIFFICULTIES = ["Anfänger", "Fortgeschritten", "Profi"]
+CATEGORIES = ["Strength", "Cardio", "Yoga", "Stretching", "Plyometrics", "Powerlifting"]
+CHUNK_SIZE = 10_000
+
+
+def _chunks(rows, size=CHUNK_SIZE):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _insert(table, rows):
+    for chunk in _chunks(rows):
+        db.session.execute(insert(table), chunk)
+    db.session.commit()
+
+
+def _sync_sequence(table):
+    """Nach Inserts mit expliziten IDs die Postgres-Sequenz nachziehen (SQLite braucht das nicht)"""
+    if db.engine.dialect.name == "postgresql":
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), (SELECT max(id) FROM \"{table}\"))"
+        ))
+        db.session.commit()
+
+
+def generate(users=100, workouts=200, subscriptions=8, days=365, seed=42):
+    """Füllt die Datenbank und gibt die Anzahl erzeugter Zeilen zurück"""
+    rng = random.Random(seed)
+    counts = {}
+
+    first_workout_id = (db.session.query(db.func.max(Workout.id)).scalar() or 0) + 1
+    _insert(Workout, [{
+        'id': first_workout_id + i,
+        'name': f"Bench Workout {i}",
+        'description': "Synthetisches Workout für Benchmarks. " * rng.randint(1, 20),
+        'duration': rng.choice([10, 15, 20, 30, 45, 60, 90]),
+        'difficulty': rng.choice(DIFFICULTIES),
+        'category': rng.choice(CATEGORIES),
+    } for i in range(workouts)])
+    _sync_sequence(Workout.__tablename__)
+    workout_ids = list(range(first_workout_id, first_workout_id + workouts))
+    counts['workouts'] = workouts
+
+    # Ein Hash für alle - PBKDF2 pro User würde die Generierung dominieren
+    password_hash = generate_password_hash(BENCH_PASSWORD, method="pbkdf2:sha256", salt_length=16)
+    first_user_id = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+    _insert(User, [{
+        'id': first_user_id + i,
+        'email': BENCH_EMAIL.format(first_user_id + i),
+        'name': f"Bench User {first_user_id + i}",
+        'hash_password': password_hash,
+    } for i in range(users)])
+    _sync_sequence(User.__tablename__)
+    user_ids = list(range(first_user_id, first_user_id + users))
+    counts['users'] = users
+
+    subscribed = {}
+    subscription_rows = []
+    for user_id in user_ids:
+        picks = rng.sample(workout_ids, min(len(workout_ids), max(1, int(rng.expovariate(1 / subscriptions)))))
+        subscribed[user_id] = picks
+        subscription_rows.extend({'user_id': user_id, 'workout_id': workout_id,
+                                  'created_at': datetime.now(), 'is_favorite': rng.random() < 0.1,
+                                  'progress': rng.randint(0, 100)}
+                                 for workout_id in picks)
+    _insert(user_workouts, subscription_rows)
+    counts['user_workouts'] = len(subscription_rows)
+
+    today = date.today()
+    streak_count = 0
+    pending = []
+    for user_id in user_ids:
+        # Aktivität pro User: manche trainieren fast täglich, viele nur gelegentlich
+        base = rng.betavariate(2, 5)
+        stay_active = min(0.95, base + 0.3)
+        active = False
+        for offset in range(days, -1, -1):
+            day = today - timedelta(days=offset)
+            active = rng.random() < (stay_active if active else base * 0.6)
+            if not active:
+                continue
+            for workout_id in rng.sample(subscribed[user_id], min(len(subscribed[user_id]), rng.randint(1, 3))):
+                timestamp = datetime.combine(day, datetime.min.time()) + timedelta(
+                    hours=rng.randint(6, 21), minutes=rng.randint(0, 59))
+                pending.append({'user_id': user_id, 'workout_id': workout_id,
+                                'timestamp': timestamp, 'activity_day': day, 'created_at': timestamp})
+        if len(pending) >= CHUNK_SIZE:
+            streak_count += len(pending)
+            _insert(StreakExercise, pending)
+            pending = []
+
+    streak_count += len(pending)
+    _insert(StreakExercise, pending)
+    counts['streak_exercises'] = streak_count
+
+    counts['user_activity_days'] = rebuild_activity_days()
+    counts['streak_states'] = rebuild_streak_states()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--workouts", type=int, default=200)
+    parser.add_argument("--subscriptions", type=int, default=8, help="mittlere Abos pro User")
+    parser.add_argument("--days", type=int, default=365, help="Tage Historie pro User")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with app.app_context():
+        migrations.upgrade(db.engine, db.metadata)
+        started = time.perf_counter()
+        counts = generate(args.users, args.workouts, args.subscriptions, args.days, args.seed)
+        print(f" Testdaten erzeugt in {time.perf_counter() - started:.1f}s: {counts}")
+
+
+if __name__ == "__main__":
+    main()
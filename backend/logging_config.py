@@ -0,0 +1,63 @@
+"""Logging ohne Blockieren des Request-Threads.
+
+Alle Records landen über einen QueueHandler in einer Queue; ein
+QueueListener-Thread formatiert und schreibt sie nach stdout. Level lassen
+sich pro Modul setzen (``LOG_LEVELS="app=INFO,werkzeug=WARNING"``) und das
+Access-Log wird mit ``ACCESS_LOG_SAMPLE_RATE`` gesampelt.
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+
+_listener = None
+
+
+def parse_levels(spec):
+    """'app=INFO,werkzeug=WARNING' -> {'app': 'INFO', 'werkzeug': 'WARNING'}"""
+    levels = {}
+    for part in (spec or "").split(","):
+        name, sep, level = part.partition("=")
+        if sep and name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(level="INFO", module_levels=None, stream=None):
+    """Richtet Queue-basiertes Logging einmal pro Prozess ein"""
+    global _listener
+
+    root = logging.getLogger()
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    for name, module_level in (module_levels or {}).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    if _listener is not None:
+        return _listener
+
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    root.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+
+class AccessLogSampler:
+    """Entscheidet pro Request, ob er im Access-Log landet - Fehler immer"""
+
+    def __init__(self, rate=1.0):
+        self.rate = max(0.0, min(1.0, rate))
+
+    def should_log(self, status_code):
+        if status_code >= 500:
+            return True
+        return self.rate >= 1.0 or random.random() < self.rate
@@ -0,0 +1,197 @@
+"""Versionierte Schema-Migrationen.
+
+Jede Migration läuft genau einmal in einer eigenen Transaktion und wird in
+der Tabelle ``schema_version`` vermerkt. Ausgeführt wird beim Deploy über
+``flask db-upgrade``; Worker prüfen beim Start nur noch die Versionsnummer.
+
+Die Schritte sind idempotent geschrieben, damit Datenbanken, die noch mit
+den alten Import-Zeit-DDLs angelegt wurden, sauber auf Version 1 ff. kommen.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime
+
+import sqlalchemy as sa
+
+import streaks
+from streaks import ALL_WORKOUTS
+
+_version_metadata = sa.MetaData()
+schema_version = sa.Table(
+    "schema_version", _version_metadata,
+    sa.Column("version", sa.Integer, primary_key=True),
+    sa.Column("description", sa.String(200), nullable=False),
+    sa.Column("applied_at", sa.DateTime, nullable=False),
+)
+
+MIGRATIONS = []  # (version, description, step(conn, metadata))
+
+
+def migration(version, description):
+    def register(step):
+        MIGRATIONS.append((version, description, step))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return step
+    return register
+
+
+def latest_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def current_version(engine):
+    """Aktuelle Schema-Version (0 wenn noch nie migriert wurde)"""
+    with engine.connect() as conn:
+        if not sa.inspect(conn).has_table("schema_version"):
+            return 0
+        return conn.execute(sa.select(sa.func.max(schema_version.c.version))).scalar() or 0
+
+
+def upgrade(engine, metadata, target=None):
+    """Führt alle offenen Migrationen bis target aus und gibt die angewendeten zurück"""
+    _version_metadata.create_all(engine)
+    current = current_version(engine)
+    target = latest_version() if target is None else target
+
+    applied = []
+    for version, description, step in MIGRATIONS:
+        if version <= current or version > target:
+            continue
+        with engine.begin() as conn:
+            step(conn, metadata)
+            conn.execute(schema_version.insert().values(
+                version=version, description=description, applied_at=datetime.now()
+            ))
+        applied.append((version, description))
+    return applied
+
+
+def _columns(conn, table):
+    return {column["name"] for column in sa.inspect(conn).get_columns(table)}
+
+
+def _day_of(conn, column):
+    """Tagesanteil eines Timestamps - CAST AS DATE liefert unter SQLite nur das Jahr"""
+    if conn.dialect.name == "sqlite":
+        return sa.func.date(column)
+    return sa.cast(column, sa.Date)
+
+
+def _create_indexes(conn, table):
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
+
+
+@migration(1, "Basisschema: user, workouts, user_workouts, streak_exercises")
+def _baseline(conn, metadata):
+    tables = metadata.tables
+    existing = set(sa.inspect(conn).get_table_names())
+    metadata.create_all(conn, tables=[
+        tables[name] for name in ("user", "workouts", "user_workouts", "streak_exercises")
+        if name not in existing
+    ])
+    if "user" in existing and "name" not in _columns(conn, "user"):
+        conn.execute(sa.text('ALTER TABLE "user" ADD COLUMN name VARCHAR(100)'))
+
+
+@migration(2, "Indizes für Workout-Filter und api_exercise_id")
+def _workout_indexes(conn, metadata):
+    _create_indexes(conn, metadata.tables["workouts"])
+
+
+@migration(3, "user_activity_days mit Backfill")
+def _activity_days(conn, metadata):
+    table = metadata.tables["user_activity_days"]
+    table.create(conn, checkfirst=True)
+    conn.execute(table.delete())
+    entries = sa.table("streak_exercises", sa.column("user_id"), sa.column("workout_id"), sa.column("timestamp"))
+    day = _day_of(conn, entries.c.timestamp)
+    conn.execute(table.insert().from_select(
+        ["user_id", "workout_id", "day", "count"],
+        sa.select(entries.c.user_id, entries.c.workout_id, day, sa.func.count())
+        .group_by(entries.c.user_id, entries.c.workout_id, day)
+    ))
+
+
+@migration(4, "streak_states mit Backfill")
+def _streak_states(conn, metadata):
+    table = metadata.tables["streak_states"]
+    table.create(conn, checkfirst=True)
+    conn.execute(table.delete())
+
+    days = defaultdict(set)
+    totals = Counter()
+    activity_days = metadata.tables["user_activity_days"]
+    rows = conn.execute(sa.select(
+        activity_days.c.user_id, activity_days.c.workout_id, activity_days.c.day, activity_days.c.count
+    ))
+    for user_id, workout_id, day, count in rows:
+        for key in ((user_id, workout_id), (user_id, ALL_WORKOUTS)):
+            days[key].add(day)
+            totals[key] += count
+
+    if days:
+        conn.execute(table.insert(), [
+            {"user_id": user_id, "workout_id": workout_id,
+             **streaks.compute_state(sorted(day_set), totals[(user_id, workout_id)])}
+            for (user_id, workout_id), day_set in days.items()
+        ])
+
+
+@migration(5, "streak_exercises.activity_day mit Backfill und Composite-Indizes")
+def _streak_activity_day(conn, metadata):
+    if "activity_day" not in _columns(conn, "streak_exercises"):
+        conn.execute(sa.text("ALTER TABLE streak_exercises ADD COLUMN activity_day DATE"))
+    entries = sa.table("streak_exercises", sa.column("activity_day"), sa.column("timestamp"))
+    conn.execute(
+        entries.update()
+        .where(entries.c.activity_day.is_(None))
+        .values(activity_day=_day_of(conn, entries.c.timestamp))
+    )
+    _create_indexes(conn, metadata.tables["streak_exercises"])
+    _create_indexes(conn, metadata.tables["user_activity_days"])
+
+
+@migration(6, "user_workouts: Defaults nachtragen und Index für die Abo-Liste")
+def _user_workouts_listing(conn, metadata):
+    table = metadata.tables["user_workouts"]
+    # Alte Zeilen können NULL enthalten - das würde die Favoriten-Sortierung und den Keyset-Cursor brechen
+    conn.execute(table.update().where(table.c.is_favorite.is_(None)).values(is_favorite=False))
+    conn.execute(table.update().where(table.c.progress.is_(None)).values(progress=0))
+    _create_indexes(conn, table)
+
+
+@migration(7, "Volltextsuche über workouts (SQLite FTS5)")
+def _workouts_fts(conn, metadata):
+    if conn.dialect.name != "sqlite":
+        # Andere Datenbanken suchen ohne eigenen Index (siehe search_workouts)
+        return
+
+    # External-Content-Tabelle: der Index speichert nur Tokens, der Text bleibt in workouts
+    conn.execute(sa.text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS workouts_fts USING fts5("
+        " name, description, category,"
+        " content='workouts', content_rowid='id',"
+        " tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    ))
+    # Trigger halten den Index bei jedem Schreibpfad aktuell - auch bei Bulk-Inserts/-Updates
+    conn.execute(sa.text(
+        "CREATE TRIGGER IF NOT EXISTS workouts_fts_ai AFTER INSERT ON workouts BEGIN"
+        " INSERT INTO workouts_fts (rowid, name, description, category)"
+        " VALUES (new.id, new.name, new.description, new.category);"
+        " END"
+    ))
+    conn.execute(sa.text(
+        "CREATE TRIGGER IF NOT EXISTS workouts_fts_ad AFTER DELETE ON workouts BEGIN"
+        " INSERT INTO workouts_fts (workouts_fts, rowid, name, description, category)"
+        " VALUES ('delete', old.id, old.name, old.description, old.category);"
+        " END"
+    ))
+    conn.execute(sa.text(
+        "CREATE TRIGGER IF NOT EXISTS workouts_fts_au AFTER UPDATE OF name, description, category ON workouts BEGIN"
+        " INSERT INTO workouts_fts (workouts_fts, rowid, name, description, category)"
+        " VALUES ('delete', old.id, old.name, old.description, old.category);"
+        " INSERT INTO workouts_fts (rowid, name, description, category)"
+        " VALUES (new.id, new.name, new.description, new.category);"
+        " END"
+    ))
+    conn.execute(sa.text("INSERT INTO workouts_fts (workouts_fts) VALUES ('rebuild')"))
@@ -0,0 +1,114 @@
+"""Passwort-Hashing außerhalb der Request-Threads.
+
+PBKDF2 ist absichtlich teuer und hält dabei den GIL - inline gerechnet bremst
+ein Login-Ansturm jeden anderen Request im selben Worker. ``PasswordHasher``
+schiebt Hashen und Prüfen in einen kleinen Prozesspool. Die Warteschlange ist
+begrenzt: Ist sie voll und wird innerhalb von ``queue_timeout`` kein Platz
+frei, wirft der Hasher ``HasherBusy`` und die Route antwortet mit 503, statt
+Threads zu blockieren, die Streak- und Workout-Requests bedienen sollen.
+
+Ändern sich Methode oder Salt-Länge, meldet ``verify`` einen neuen Hash, den
+der Aufrufer beim erfolgreichen Login speichert (rehash-on-login). Welchen
+Präfix werkzeug für die konfigurierte Methode schreibt (``scrypt`` wird zu
+``scrypt:32768:8:1``, ``pbkdf2`` zu ``pbkdf2:sha256:1000000``), ermittelt der
+Hasher einmal mit einem Probe-Hash, statt die Defaults nachzubauen.
+"""
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HasherBusy(Exception):
+    """Zu viele Hash-Aufträge in der Warteschlange"""
+
+
+def _hash(password, method, salt_length):
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+
+def _verify(pwhash, password, method, salt_length, needs_rehash):
+    """Prüft und rechnet bei Bedarf direkt im selben Worker den neuen Hash"""
+    if not check_password_hash(pwhash, password):
+        return False, None
+    return True, _hash(password, method, salt_length) if needs_rehash else None
+
+
+def stored_method(pwhash):
+    """Methoden-Präfix eines gespeicherten Hashes, z.B. scrypt:32768:8:1"""
+    return pwhash.partition("$")[0]
+
+
+class PasswordHasher:
+    def __init__(self, method="pbkdf2:sha256", salt_length=16, workers=2, max_pending=16,
+                 queue_timeout=1.0, observer=None):
+        self.method = method
+        self.salt_length = salt_length
+        self._stored_method = None
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        # observer(event) mit event "queued", "done" oder "rejected" - für Metriken
+        self.observer = observer
+
+        # Plätze = laufende + wartende Aufträge; workers=0 rechnet inline (Entwicklung)
+        self._slots = threading.BoundedSemaphore(max(1, workers + max_pending))
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _executor(self):
+        # Erst beim ersten Login starten, damit Imports (CLI, Skripte) keine Prozesse erzeugen
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def _submit(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self._observe("rejected")
+            raise HasherBusy("Passwort-Hashing ausgelastet")
+        self._observe("queued")
+        try:
+            future = self._executor().submit(fn, *args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future.result()
+
+    def _release(self, _future):
+        self._slots.release()
+        self._observe("done")
+
+    def _observe(self, event):
+        if self.observer is not None:
+            self.observer(event)
+
+    def stored_method(self):
+        """Präfix, den werkzeug für self.method schreibt - per Probe-Hash beim ersten Aufruf.
+
+        Nicht im Konstruktor: ein PBKDF2-Hash kostet ~0,5 s, die sonst jeder Import zahlen würde.
+        """
+        if self._stored_method is None:
+            self._stored_method = stored_method(self.hash(""))
+        return self._stored_method
+
+    def needs_rehash(self, pwhash):
+        salt = pwhash.partition("$")[2].partition("$")[0]
+        return stored_method(pwhash) != self.stored_method() or len(salt) != self.salt_length
+
+    def hash(self, password):
+        return self._submit(_hash, password, self.method, self.salt_length)
+
+    def verify(self, pwhash, password):
+        """Liefert (gültig, neuer_hash); neuer_hash ist None, solange die Parameter passen"""
+        return self._submit(_verify, pwhash, password, self.method, self.salt_length,
+                            self.needs_rehash(pwhash))
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,196 @@
+"""Speicher für ausgegebene Refresh Tokens (Rotation und Widerruf).
+
+Gespeichert wird nur die ``jti`` eines Refresh Tokens mit User und Ablauf.
+Beim Refresh wird die alte ``jti`` per Primärschlüssel gelöscht und die neue
+in derselben Transaktion eingetragen - war die alte schon weg (rotiert,
+widerrufen, abgelaufen), schlägt der Refresh fehl. Mit dem SQLite-Backend
+funktioniert das über mehrere Worker-Prozesse hinweg; das In-Memory-Backend
+ist für Entwicklung und einen einzelnen Prozess gedacht.
+
+Abgelaufene Einträge räumt ``start_sweeper`` im Hintergrund in Batches über
+den Index auf ``expires_at`` ab.
+"""
+import heapq
+from abc import ABC, abstractmethod
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshTokenStore(ABC):
+    """Schnittstelle; user_id wird immer als String (JWT ``sub``) gespeichert"""
+
+    @abstractmethod
+    def add(self, jti, user_id, expires_at):
+        """Trägt ein neu ausgegebenes Refresh Token ein"""
+
+    @abstractmethod
+    def rotate(self, old_jti, user_id, new_jti, expires_at):
+        """Ersetzt old_jti atomar durch new_jti; False, wenn old_jti nicht (mehr) gültig ist"""
+
+    @abstractmethod
+    def revoke(self, jti):
+        """Widerruft ein einzelnes Refresh Token"""
+
+    @abstractmethod
+    def revoke_user(self, user_id):
+        """Widerruft alle Refresh Tokens eines Users und gibt die Anzahl zurück"""
+
+    @abstractmethod
+    def sweep(self, batch_size=1000, now=None):
+        """Löscht abgelaufene Einträge in Batches und gibt die Anzahl zurück"""
+
+    def start_sweeper(self, interval=300, batch_size=1000):
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    removed = self.sweep(batch_size)
+                    if removed:
+                        logger.info("%d abgelaufene Refresh Tokens entfernt", removed)
+                except Exception:
+                    logger.exception("Aufräumen der Refresh Tokens fehlgeschlagen")
+
+        thread = threading.Thread(target=run, name="refresh-token-sweeper", daemon=True)
+        thread.start()
+        return thread
+
+
+class MemoryRefreshTokenStore(RefreshTokenStore):
+    def __init__(self):
+        self._tokens = {}  # jti -> (user_id, expires_at)
+        self._expiry = []  # Heap (expires_at, jti) als Ablauf-Index
+        self._lock = threading.Lock()
+
+    def add(self, jti, user_id, expires_at):
+        with self._lock:
+            self._tokens[jti] = (str(user_id), expires_at)
+            heapq.heappush(self._expiry, (expires_at, jti))
+
+    def rotate(self, old_jti, user_id, new_jti, expires_at):
+        with self._lock:
+            entry = self._tokens.get(old_jti)
+            if entry is None or entry[0] != str(user_id) or entry[1] <= time.time():
+                return False
+            del self._tokens[old_jti]
+            self._tokens[new_jti] = (str(user_id), expires_at)
+            heapq.heappush(self._expiry, (expires_at, new_jti))
+            return True
+
+    def revoke(self, jti):
+        # Der Heap-Eintrag bleibt liegen und verschwindet beim nächsten sweep
+        with self._lock:
+            self._tokens.pop(jti, None)
+
+    def revoke_user(self, user_id):
+        with self._lock:
+            jtis = [jti for jti, (owner, _) in self._tokens.items() if owner == str(user_id)]
+            for jti in jtis:
+                del self._tokens[jti]
+            return len(jtis)
+
+    def sweep(self, batch_size=1000, now=None):
+        now = time.time() if now is None else now
+        removed = 0
+        while True:
+            with self._lock:
+                batch = 0
+                while self._expiry and self._expiry[0][0] <= now and batch < batch_size:
+                    expires_at, jti = heapq.heappop(self._expiry)
+                    entry = self._tokens.get(jti)
+                    if entry is not None and entry[1] == expires_at:
+                        del self._tokens[jti]
+                        removed += 1
+                    batch += 1
+                done = not self._expiry or self._expiry[0][0] > now
+            if done:
+                return removed
+
+
+class SQLiteRefreshTokenStore(RefreshTokenStore):
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS refresh_tokens ("
+            " jti TEXT PRIMARY KEY,"
+            " user_id TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_refresh_tokens_expires_at ON refresh_tokens (expires_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_refresh_tokens_user_id ON refresh_tokens (user_id)")
+
+    def _connect(self):
+        """Eine Verbindung pro Thread im Autocommit-Modus; WAL erlaubt parallele Leser"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, jti, user_id, expires_at):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO refresh_tokens (jti, user_id, expires_at) VALUES (?, ?, ?)",
+            (jti, str(user_id), expires_at),
+        )
+
+    def rotate(self, old_jti, user_id, new_jti, expires_at):
+        conn = self._connect()
+        # IMMEDIATE sperrt sofort für Schreiber - zwei Prozesse können dieselbe jti nicht beide verbrauchen
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            deleted = conn.execute(
+                "DELETE FROM refresh_tokens WHERE jti = ? AND user_id = ? AND expires_at > ?",
+                (old_jti, str(user_id), time.time()),
+            ).rowcount
+            if deleted:
+                conn.execute(
+                    "INSERT INTO refresh_tokens (jti, user_id, expires_at) VALUES (?, ?, ?)",
+                    (new_jti, str(user_id), expires_at),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return bool(deleted)
+
+    def revoke(self, jti):
+        self._connect().execute("DELETE FROM refresh_tokens WHERE jti = ?", (jti,))
+
+    def revoke_user(self, user_id):
+        return self._connect().execute(
+            "DELETE FROM refresh_tokens WHERE user_id = ?", (str(user_id),)
+        ).rowcount
+
+    def sweep(self, batch_size=1000, now=None):
+        now = time.time() if now is None else now
+        conn = self._connect()
+        removed = 0
+        while True:
+            # Kleine Batches halten die Schreibsperre kurz, Refreshes laufen dazwischen weiter
+            deleted = conn.execute(
+                "DELETE FROM refresh_tokens WHERE jti IN ("
+                " SELECT jti FROM refresh_tokens WHERE expires_at <= ? LIMIT ?)",
+                (now, batch_size),
+            ).rowcount
+            removed += deleted
+            if deleted < batch_size:
+                return removed
+
+
+def create_store(backend, path=None):
+    if backend == "memory":
+        return MemoryRefreshTokenStore()
+    if backend == "sqlite":
+        return SQLiteRefreshTokenStore(path)
+    raise ValueError(f"Unbekanntes Refresh-Token-Backend: {backend}")
@@ -0,0 +1,100 @@
+"""JSON-Encoding, Kompression und Sparse Fieldsets für API-Antworten.
+
+Ist ``orjson`` installiert, serialisiert ``jsonify`` damit statt mit dem
+json-Modul der Standardbibliothek - bei langen Listen wie /external-workouts
+ein Vielfaches schneller. Antworten ab einer Mindestgröße werden je nach
+``Accept-Encoding`` mit Brotli (falls ``brotli`` installiert ist) oder gzip
+komprimiert. Beide Pakete sind optional; ohne sie bleibt es beim alten
+Verhalten.
+"""
+import gzip
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/plain", "text/html", "text/csv"}
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON-Provider mit orjson; fällt ohne orjson auf den Flask-Standard zurück"""
+
+    def _orjson_options(self):
+        # Gleiche Ausgabe wie der Flask-Standard: sortierte Keys, Zahlen als Keys erlaubt,
+        # date/datetime über self.default als HTTP-Datum statt als ISO 8601
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._orjson_options()).decode()
+
+    def response(self, *args, **kwargs):
+        # Im Debug-Modus rückt Flask die Ausgabe ein - das übernimmt weiter der Standard-Encoder
+        if orjson is None or (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._orjson_options())
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def available_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def compress_response(response, accept_encodings, min_size=1024, gzip_level=6, brotli_quality=5):
+    """Komprimiert den Body, wenn Client, Content-Type und Größe passen"""
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    # Caches müssen je nach Accept-Encoding unterschiedliche Varianten halten
+    response.vary.add("Accept-Encoding")
+    encoding = accept_encodings.best_match(available_encodings())
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+
+    if encoding == "br":
+        data = brotli.compress(data, quality=brotli_quality)
+    else:
+        data = gzip.compress(data, compresslevel=gzip_level)
+    response.set_data(data)
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def parse_fields(raw, allowed=None):
+    """fields=a,b als Tupel; None ohne Parameter. Unbekannte Felder -> ValueError"""
+    if raw is None:
+        return None
+    fields = tuple(dict.fromkeys(field.strip() for field in raw.split(",") if field.strip()))
+    if not fields:
+        raise ValueError("fields darf nicht leer sein")
+    if allowed is not None:
+        unknown = [field for field in fields if field not in allowed]
+        if unknown:
+            raise ValueError(f"Unbekannte Felder: {', '.join(unknown)} (erlaubt: {', '.join(allowed)})")
+    return fields
+
+
+def select_fields(item, fields):
+    """Nur die angefragten Felder eines Dicts; fields None = alles"""
+    if fields is None:
+        return item
+    return {field: item[field] for field in fields if field in item}
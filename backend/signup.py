@@ -8,7 +8,9 @@ from typing import Optional
 import jwt
 from flask import Flask, request, jsonify, make_response
 from flask_cors import CORS
-from werkzeug.security import generate_password_hash, check_password_hash
+
+from password_hashing import PasswordHasher, HasherBusy
+from refresh_tokens import create_store
 
 app = Flask(__name__)
 CORS(app,
@@ -21,9 +23,32 @@ JWT_ISSUER = "my-flask-api"
 ACCESS_TTL = 15 * 60          # 15 minutes
 REFRESH_TTL = 14 * 24 * 3600  # 14 days
 
+# hashing runs in a process pool so login bursts don't stall other requests
+password_hasher = PasswordHasher(
+    os.environ.get("PASSWORD_HASH_METHOD", "pbkdf2:sha256"),
+    salt_length=int(os.environ.get("PASSWORD_SALT_LENGTH", 16)),
+    workers=int(os.environ.get("PASSWORD_HASH_WORKERS", 2)),
+    max_pending=int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 16)),
+    queue_timeout=float(os.environ.get("PASSWORD_HASH_QUEUE_TIMEOUT", 1.0)),
+)
+
+@app.errorhandler(HasherBusy)
+def hashing_busy(e):
+    resp = jsonify({"error": "too many logins, retry shortly"})
+    resp.status_code = 503
+    resp.headers["Retry-After"] = "1"
+    return resp
+
 # --- demo "database"
 USERS = {}          # email -> {"id": ..., "email": ..., "pwd_hash": ...}
-REFRESH_STORE = {}  # refresh_jti -> {"user_id": ..., "exp": ...}  (for rotation/revocation)
+
+# refresh jtis for rotation/revocation; the sqlite backend is shared by all worker processes
+REFRESH_STORE = create_store(
+    os.environ.get("REFRESH_TOKEN_STORE", "sqlite"),
+    os.environ.get("REFRESH_TOKEN_STORE_PATH", os.path.join(app.instance_path, "refresh_tokens.db")),
+)
+REFRESH_STORE.start_sweeper(int(os.environ.get("REFRESH_TOKEN_SWEEP_INTERVAL", 300)),
+                            int(os.environ.get("REFRESH_TOKEN_SWEEP_BATCH", 1000)))
 
 def create_jwt(sub: str, kind: str, ttl: int, extra: Optional[dict] = None):
     now = int(time.time())
@@ -71,7 +96,7 @@ def register():
     if email in USERS:
         return jsonify({"error": "email already registered"}), 409
 
-    pwd_hash = generate_password_hash(password, method="pbkdf2:sha256", salt_length=16)
+    pwd_hash = password_hasher.hash(password)
     user_id = str(uuid.uuid4())
     USERS[email] = {"id": user_id, "email": email, "pwd_hash": pwd_hash}
     return jsonify({"ok": True})
@@ -82,14 +107,19 @@ def login():
     email = (data.get("email") or "").strip().lower()
     password = data.get("password") or ""
     user = USERS.get(email)
-    if not user or not check_password_hash(user["pwd_hash"], password):
+    if not user:
         return jsonify({"error": "invalid credentials"}), 401
+    valid, new_hash = password_hasher.verify(user["pwd_hash"], password)
+    if not valid:
+        return jsonify({"error": "invalid credentials"}), 401
+    if new_hash:
+        user["pwd_hash"] = new_hash  # hash params changed -> upgrade on login
 
     access, access_payload = create_jwt(user["id"], "access", ACCESS_TTL)
     refresh, refresh_payload = create_jwt(user["id"], "refresh", REFRESH_TTL)
 
     # store refresh jti so we can rotate/revoke later
-    REFRESH_STORE[refresh_payload["jti"]] = {"user_id": user["id"], "exp": refresh_payload["exp"]}
+    REFRESH_STORE.add(refresh_payload["jti"], user["id"], refresh_payload["exp"])
 
     resp = make_response({"access_token": access, "user_id": user["id"]})
     set_refresh_cookie(resp, refresh)
@@ -106,16 +136,11 @@ def refresh():
     except jwt.PyJWTError as e:
         return jsonify({"error": str(e)}), 401
 
-    jti = payload["jti"]
-    info = REFRESH_STORE.get(jti)
-    if not info or info["user_id"] != payload["sub"]:
+    # Rotate: consume old jti and store the new one atomically
+    new_refresh, new_rp = create_jwt(payload["sub"], "refresh", REFRESH_TTL)
+    if not REFRESH_STORE.rotate(payload.get("jti"), payload["sub"], new_rp["jti"], new_rp["exp"]):
         return jsonify({"error": "refresh revoked"}), 401
-
-    # Rotate: revoke old, issue new refresh
-    del REFRESH_STORE[jti]
     new_access, _ = create_jwt(payload["sub"], "access", ACCESS_TTL)
-    new_refresh, new_rp = create_jwt(payload["sub"], "refresh", REFRESH_TTL)
-    REFRESH_STORE[new_rp["jti"]] = {"user_id": payload["sub"], "exp": new_rp["exp"]}
 
     resp = make_response({"access_token": new_access})
     set_refresh_cookie(resp, new_refresh)
@@ -127,7 +152,7 @@ def logout():
     if token:
         try:
             payload = verify_jwt(token, "refresh")
-            REFRESH_STORE.pop(payload.get("jti"), None)
+            REFRESH_STORE.revoke(payload.get("jti"))
         except jwt.PyJWTError:
             pass
     resp = make_response({"ok": True})
@@ -0,0 +1,66 @@
+"""SQLite-Profile für die App-Datenbank.
+
+Mit den Standardwerten (Rollback-Journal, synchronous=FULL, kein busy_timeout)
+blockiert jeder Schreiber alle Leser und parallele Requests laufen in
+"database is locked". Das Profil "production" schaltet auf WAL - Leser sehen
+den letzten Commit, während geschrieben wird - und setzt die übrigen Pragmas
+bei jeder neuen Verbindung. Optional gibt es eine zweite, schreibgeschützte
+Engine auf dieselbe Datei für reine Lese-Requests.
+"""
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+PROFILES = {
+    # SQLite-Standard, nur busy_timeout statt sofortigem "database is locked"
+    "default": {
+        "busy_timeout": 5000,
+    },
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",  # in WAL sicher gegen Korruption, verliert höchstens den letzten Commit bei Stromausfall
+        "busy_timeout": 5000,
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,  # negativ = KiB, also 64 MB pro Verbindung
+        "temp_store": "MEMORY",
+    },
+}
+
+# Pragmas, die in der Datei gespeichert werden und sich nur schreibend setzen lassen
+_PERSISTENT = {"journal_mode"}
+
+
+def profile_pragmas(name, **overrides):
+    """Pragmas eines Profils; overrides mit Wert None werden ignoriert"""
+    if name not in PROFILES:
+        raise ValueError(f"Unbekanntes SQLite-Profil: {name}")
+    pragmas = dict(PROFILES[name])
+    pragmas.update({key: value for key, value in overrides.items() if value is not None})
+    return pragmas
+
+
+def apply_pragmas(engine, pragmas, read_only=False):
+    """Registriert einen connect-Listener, der die Pragmas je Verbindung setzt"""
+    if read_only:
+        pragmas = {key: value for key, value in pragmas.items() if key not in _PERSISTENT}
+        pragmas["query_only"] = "ON"
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for key, value in pragmas.items():
+                cursor.execute(f"PRAGMA {key}={value}")
+        finally:
+            cursor.close()
+
+
+def read_only_uri(uri, instance_path):
+    """URI für eine schreibgeschützte Verbindung auf dieselbe SQLite-Datei"""
+    url = make_url(uri)
+    path = url.database
+    if not os.path.isabs(path):
+        # Flask-SQLAlchemy legt relative SQLite-Pfade in den instance-Ordner
+        path = os.path.join(instance_path, path)
+    return f"sqlite:///file:{path}?mode=ro&uri=true"
@@ -0,0 +1,75 @@
+"""Reine Streak-Berechnungen ohne Datenbankzugriff.
+
+Ein Streak-Zustand besteht aus dem Lauf, der am letzten aktiven Tag endet
+(current_run/last_day), dem längsten Lauf (longest_run/longest_end) und der
+Anzahl geloggter Einträge (total_entries).
+"""
+from datetime import date, timedelta
+
+ONE_DAY = timedelta(days=1)
+ALL_WORKOUTS = 0  # workout_id des Gesamt-Streaks eines Users
+
+
+def compute_state(sorted_dates, total_entries=0):
+    """Berechnet den kompletten Zustand aus aufsteigend sortierten, eindeutigen Tagen"""
+    state = {
+        'current_run': 0,
+        'longest_run': 0,
+        'longest_end': None,
+        'last_day': None,
+        'total_entries': total_entries,
+    }
+    for day in sorted_dates:
+        if not advance(state, day):
+            raise ValueError("sorted_dates muss aufsteigend sortiert sein")
+    return state
+
+
+def advance(state, day):
+    """Trägt einen aktiven Tag in O(1) ein.
+
+    Gibt False zurück, wenn der Tag vor last_day liegt - dann muss der
+    Aufrufer neu berechnen, weil der Tag Läufe verbinden kann.
+    """
+    last_day = state['last_day']
+    if last_day is not None and day < last_day:
+        return False
+
+    if last_day is None or day > last_day + ONE_DAY:
+        state['current_run'] = 1
+    elif day == last_day + ONE_DAY:
+        state['current_run'] += 1
+    # day == last_day: Tag war schon aktiv, nichts zu tun
+
+    state['last_day'] = day
+    if state['current_run'] > state['longest_run']:
+        state['longest_run'] = state['current_run']
+        state['longest_end'] = day
+    return True
+
+
+def run_ending_at(dates_desc, day):
+    """Länge des Laufs, der an day endet; dates_desc ist absteigend sortiert und darf ein Iterator sein"""
+    run = 0
+    expected = day
+    for d in dates_desc:
+        if d > expected:
+            continue
+        if d != expected:
+            break
+        run += 1
+        expected -= ONE_DAY
+    return run
+
+
+def in_run(day, end, length):
+    """Liegt day im Lauf der Länge length, der an end endet?"""
+    return end is not None and end - timedelta(days=length - 1) <= day <= end
+
+
+def current_streak(last_day, current_run, today=None):
+    """Aktueller Streak: der letzte Lauf zählt nur, wenn er heute oder gestern endet"""
+    today = today or date.today()
+    if last_day is None or last_day < today - ONE_DAY:
+        return 0
+    return current_run
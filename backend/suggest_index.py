@@ -0,0 +1,181 @@
+"""Präfix-Index für die Typeahead-Suche nach Exercise-Namen.
+
+Jeder Name wird normalisiert (Kleinschreibung, ohne Akzente) und mit jedem
+Wortanfang als Schlüssel in einer sortierten Liste abgelegt - "Bench Press"
+findet man so über "ben" und über "pre". Eine Abfrage ist ein ``bisect`` auf
+den Präfix-Bereich; gerankt wird nach Abonnenten.
+
+Kurze Präfixe wie "p" treffen einen großen Teil des Katalogs. Für Bereiche
+über ``cache_threshold`` Schlüsseln merkt sich der Index deshalb die besten
+``cache_depth`` Treffer und hält sie bei neuen Namen und Abo-Änderungen
+direkt aktuell, statt den Bereich bei jedem Tastendruck neu zu durchlaufen.
+Die Listen aller Präfixe bis ``warm_length`` Zeichen - die ersten Tastendrücke -
+entstehen schon beim Aufbau in einem Durchlauf und werden nie verdrängt.
+"""
+import bisect
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, defaultdict
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text):
+    """Kleinbuchstaben ohne Akzente, Wörter durch ein Leerzeichen getrennt"""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(_WORD.findall(text))
+
+
+def _word_keys(normalized):
+    """Alle Schlüssel eines Namens: der Name ab jedem Wortanfang"""
+    return [normalized] + [normalized[match.end():] for match in re.finditer(" ", normalized)]
+
+
+class PrefixIndex:
+    def __init__(self, cache_threshold=500, cache_depth=20, cache_size=1024, warm_length=2):
+        self.cache_threshold = cache_threshold
+        self.cache_depth = cache_depth
+        self.cache_size = cache_size
+        self.warm_length = warm_length
+
+        self._entries = {}  # normalisierter Name -> [Name, workout_id, Abonnenten]
+        self._keys = []  # sortiert: (Schlüssel, normalisierter Name)
+        self._by_workout = {}  # workout_id -> normalisierter Name
+        self._top = OrderedDict()  # Präfix -> beste normalisierte Namen, nach Rang sortiert
+        self._lock = threading.Lock()
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _rank(self, normalized):
+        # Mehr Abonnenten zuerst, bei Gleichstand kürzere Namen (näher an der Eingabe)
+        name, _, subscribers = self._entries[normalized]
+        return -subscribers, len(name), name
+
+    def _add(self, name, workout_id, subscribers, new_keys):
+        """Trägt einen Namen ein und gibt den normalisierten Namen zurück, falls er neu ist"""
+        normalized = normalize(name)
+        if not normalized:
+            return None
+        entry = self._entries.get(normalized)
+        if entry is not None:
+            # Ein lokales Workout ersetzt den gleichnamigen Namen aus dem API-Cache
+            if workout_id is not None and entry[1] is None:
+                entry[1] = workout_id
+                self._by_workout[workout_id] = normalized
+            return None
+        self._entries[normalized] = [name, workout_id, subscribers]
+        if workout_id is not None:
+            self._by_workout[workout_id] = normalized
+        new_keys.extend((key, normalized) for key in _word_keys(normalized))
+        return normalized
+
+    def _touch(self, normalized, improved):
+        """Hält die gemerkten Top-Listen aktuell, nachdem sich ein Eintrag geändert hat"""
+        keys = _word_keys(normalized)
+        for prefix in list(self._top):
+            if not any(key.startswith(prefix) for key in keys):
+                continue
+            names = self._top[prefix]
+            if normalized in names:
+                if improved:
+                    names.sort(key=self._rank)
+                else:
+                    # Abgerutscht - wer nachrückt, weiß nur der volle Bereich
+                    del self._top[prefix]
+            elif improved and (len(names) < self.cache_depth or self._rank(normalized) < self._rank(names[-1])):
+                names.append(normalized)
+                names.sort(key=self._rank)
+                del names[self.cache_depth:]
+
+    def _warm_top(self):
+        """Top-Listen aller Präfixe bis warm_length Zeichen, in einem Durchlauf über die Schlüssel"""
+        matches = defaultdict(set)
+        for key, normalized in self._keys:
+            for length in range(1, min(self.warm_length, len(key)) + 1):
+                matches[key[:length]].add(normalized)
+        return OrderedDict((prefix, heapq.nsmallest(self.cache_depth, names, key=self._rank))
+                           for prefix, names in matches.items() if not prefix.endswith(" "))
+
+    def _remember(self, prefix, names):
+        self._top[prefix] = names
+        if len(self._top) <= self.cache_size:
+            return
+        # Verdrängt wird nur, was nicht vorberechnet ist
+        for evicted in self._top:
+            if len(evicted) > self.warm_length:
+                del self._top[evicted]
+                return
+
+    def rebuild(self, workouts, api_names=()):
+        """Baut den Index neu auf; workouts sind (id, name, Abonnenten)"""
+        fresh = PrefixIndex(self.cache_threshold, self.cache_depth, self.cache_size, self.warm_length)
+        keys = []
+        for workout_id, name, subscribers in workouts:
+            fresh._add(name, workout_id, subscribers or 0, keys)
+        for name in api_names:
+            fresh._add(name, None, 0, keys)
+        keys.sort()
+        fresh._keys = keys
+        top = fresh._warm_top()
+
+        with self._lock:
+            self._entries, self._by_workout, self._keys = fresh._entries, fresh._by_workout, keys
+            self._top = top
+            self.built_at = time.monotonic()
+
+    def add_many(self, items):
+        """Trägt (name, workout_id) nach - workout_id None für Namen aus dem API-Cache"""
+        with self._lock:
+            new_keys = []
+            added = [normalized for name, workout_id in items
+                     if (normalized := self._add(name, workout_id, 0, new_keys))]
+            if len(new_keys) > 32:
+                # Größerer Import: einmal sortieren und die Top-Listen neu berechnen
+                self._keys.extend(new_keys)
+                self._keys.sort()
+                self._top = self._warm_top()
+                return
+            for key in new_keys:
+                bisect.insort(self._keys, key)
+            for normalized in added:
+                self._touch(normalized, improved=True)
+
+    def adjust_subscribers(self, workout_id, delta):
+        with self._lock:
+            normalized = self._by_workout.get(workout_id)
+            if normalized is not None:
+                entry = self._entries[normalized]
+                entry[2] = max(0, entry[2] + delta)
+                self._touch(normalized, improved=delta > 0)
+
+    def suggest(self, prefix, limit=10):
+        """Top-k Namen, deren Name oder eines ihrer Wörter mit prefix beginnt"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        with self._lock:
+            names = self._top.get(prefix)
+            if names is not None and limit <= self.cache_depth:
+                self._top.move_to_end(prefix)
+                names = names[:limit]
+            else:
+                keys = self._keys
+                start = bisect.bisect_left(keys, (prefix,))
+                end = bisect.bisect_left(keys, (prefix + "\U0010ffff",), start)
+                matches = {keys[index][1] for index in range(start, end)}
+                # Vorberechnete Präfixe, die _touch verworfen hat, kommen unabhängig von der Breite zurück
+                remember = end - start > self.cache_threshold or len(prefix) <= self.warm_length
+                best = heapq.nsmallest(max(limit, self.cache_depth) if remember else limit, matches, key=self._rank)
+                if remember:
+                    self._remember(prefix, best[:self.cache_depth])
+                names = best[:limit]
+
+            return [{"name": name, "workout_id": workout_id, "subscribers": subscribers}
+                    for name, workout_id, subscribers in (self._entries[normalized] for normalized in names)]
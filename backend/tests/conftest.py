@@ -0,0 +1,86 @@
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+# Die Module liegen flach in backend/ und werden dort ohne Paket importiert
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.py liest seine Konfiguration beim Import - vorher auf eine Wegwerf-Datenbank umbiegen.
+# Nie DATABASE_URL übernehmen: die Tests schreiben, und das soll nicht die echte Datenbank treffen
+_tmp = tempfile.mkdtemp(prefix="mvp-tests-")
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL") or f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ["EXERCISE_CACHE_PATH"] = os.path.join(_tmp, "exercise_cache.db")
+os.environ["REFRESH_TOKEN_STORE"] = "memory"
+os.environ["PASSWORD_HASH_WORKERS"] = "0"
+os.environ["SQLITE_READ_ENGINE"] = "0"
+os.environ["SUGGEST_INDEX_PRELOAD"] = "0"
+os.environ["LOG_LEVEL"] = "WARNING"
+
+
+@pytest.fixture(scope="session")
+def backend():
+    """Das app-Modul mit frisch migrierter Datenbank"""
+    import app as backend
+    import migrations
+
+    with backend.app.app_context():
+        migrations.upgrade(backend.db.engine, backend.db.metadata)
+    return backend
+
+
+@pytest.fixture
+def client(backend):
+    return backend.app.test_client()
+
+
+@pytest.fixture
+def make_user(backend):
+    """Legt einen User an und gibt (user_id, Authorization-Header) zurück"""
+    def make():
+        with backend.app.app_context():
+            user = backend.User(email=f"{uuid.uuid4().hex}@example.com", name="Test")
+            backend.db.session.add(user)
+            backend.db.session.commit()
+            user_id = user.id
+        token, _ = backend.create_jwt(str(user_id), "access", backend.ACCESS_TTL)
+        return user_id, {"Authorization": f"Bearer {token}"}
+    return make
+
+
+@pytest.fixture
+def make_workouts(backend):
+    """Legt n Workouts an und gibt ihre IDs zurück"""
+    def make(n):
+        with backend.app.app_context():
+            workouts = [backend.Workout(name=f"Workout {uuid.uuid4().hex[:8]}", duration=20,
+                                        difficulty="Anfänger", category="Kraft") for _ in range(n)]
+            backend.db.session.add_all(workouts)
+            backend.db.session.commit()
+            return [workout.id for workout in workouts]
+    return make
+
+
+@pytest.fixture
+def statement_counter(backend):
+    """Zählt die SQL-Statements auf der Haupt-Engine, solange der Kontext offen ist"""
+    from contextlib import contextmanager
+    from sqlalchemy import event
+
+    @contextmanager
+    def count():
+        counted = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            counted.append(statement)
+
+        with backend.app.app_context():
+            engine = backend.db.engine
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield counted
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return count
@@ -0,0 +1,150 @@
+"""asgi.py: WSGI-Brücke, vorab geholte Provider-Routen und Lifespan - mit einem Stub statt API Ninjas"""
+import asyncio
+import uuid
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+
+class StubProvider:
+    """Ersetzt AsyncExerciseProviderClient; jeder Aufruf wird gezählt und dauert delay Sekunden"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self.started = asyncio.Event()
+        self.cancelled = False
+        self.closed = False
+
+    async def fetch_exercises(self, muscle=None, difficulty=None, type=None):
+        self.calls.append((muscle, difficulty, type))
+        self.started.set()
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return [{"name": f"{muscle} stub exercise", "muscle": muscle}]
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture
+def asgi(backend, monkeypatch):
+    import asgi
+    monkeypatch.setattr(asgi, "provider", None)
+    return asgi
+
+
+def _install(asgi, monkeypatch, stub):
+    monkeypatch.setattr(asgi, "provider", stub)
+    return stub
+
+
+def _client(asgi):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi.application), base_url="http://testserver")
+
+
+def _muscle():
+    return f"m{uuid.uuid4().hex[:8]}"
+
+
+def test_plain_flask_routes(asgi):
+    async def run():
+        async with _client(asgi) as client:
+            created = await client.post("/workouts", json={
+                "name": f"ASGI {uuid.uuid4().hex[:8]}", "duration": 15, "difficulty": "Anfänger", "category": "Kraft"})
+            listed = await client.get("/workouts", params={"fields": "id,name", "limit": 200})
+            missing = await client.get("/does-not-exist")
+        return created, listed, missing
+
+    created, listed, missing = asyncio.run(run())
+    assert created.status_code == 201
+    assert listed.status_code == 200
+    assert listed.headers["content-type"].startswith("application/json")
+    workouts = listed.json()["workouts"]
+    assert all(set(workout) == {"id", "name"} for workout in workouts)
+    assert missing.status_code == 404
+
+
+def test_provider_route_is_served_from_cache(asgi, backend, monkeypatch):
+    stub = _install(asgi, monkeypatch, StubProvider())
+    muscle = _muscle()
+    backend.exercise_cache.set(f"{muscle}||", [{"name": "Cached Curl", "muscle": muscle}])
+
+    async def run():
+        async with _client(asgi) as client:
+            return await client.get("/external-workouts", params={"muscle": muscle.upper()})
+
+    response = asyncio.run(run())
+    assert response.status_code == 200
+    assert response.json()["exercises"] == [{"name": "Cached Curl", "muscle": muscle}]
+    assert stub.calls == []
+
+
+def test_concurrent_misses_share_one_upstream_call(asgi, monkeypatch):
+    stub = _install(asgi, monkeypatch, StubProvider(delay=0.2))
+    muscle = _muscle()
+
+    async def run():
+        async with _client(asgi) as client:
+            return await asyncio.gather(*(client.get("/external-workouts", params={"muscle": muscle})
+                                          for _ in range(8)))
+
+    responses = asyncio.run(run())
+    assert stub.calls == [(muscle, None, None)]
+    # Die Exercises kommen aus dem Environ - der synchrone Pfad würde API Ninjas fragen
+    assert all(response.json()["exercises"][0]["name"] == f"{muscle} stub exercise" for response in responses)
+
+
+def test_client_disconnect_cancels_upstream_call(asgi, monkeypatch):
+    stub = _install(asgi, monkeypatch, StubProvider(delay=30))
+    muscle = _muscle()
+    scope = {"type": "http", "method": "GET", "path": "/external-workouts", "root_path": "",
+             "query_string": f"muscle={muscle}".encode(), "headers": [], "http_version": "1.1"}
+    sent = []
+
+    async def run():
+        messages = iter([{"type": "http.request", "body": b"", "more_body": False}])
+
+        async def receive():
+            message = next(messages, None)
+            if message is not None:
+                return message
+            await stub.started.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        await asyncio.wait_for(asgi.application(scope, receive, send), timeout=5)
+        for _ in range(5):
+            await asyncio.sleep(0)  # Abbruch des geteilten Upstream-Tasks durchlaufen lassen
+
+    asyncio.run(run())
+    assert sent == []
+    assert stub.cancelled
+    assert not asgi.exercise_cache._inflight
+
+
+def test_lifespan_startup_and_shutdown(asgi, monkeypatch):
+    stub = _install(asgi, monkeypatch, StubProvider())
+    sent = []
+
+    async def run():
+        messages = iter([{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}])
+
+        async def receive():
+            return next(messages)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        await asyncio.wait_for(asgi.application({"type": "lifespan"}, receive, send), timeout=5)
+
+    asyncio.run(run())
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    assert stub.closed
+    assert asgi.provider is None
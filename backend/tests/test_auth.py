@@ -0,0 +1,102 @@
+"""Cache verifizierter Tokens und der Refresh-Flow mit Rotation und Widerruf"""
+import time
+
+import jwt
+import pytest
+
+from auth import VerifiedTokenCache, verify_token
+
+SECRET = "test-secret-with-at-least-32-bytes!!"
+
+
+def _token(ttl=60, **claims):
+    return jwt.encode({"sub": "1", "exp": int(time.time()) + ttl, **claims}, SECRET, algorithm="HS256")
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """Zählt die echten Signaturprüfungen"""
+    calls = []
+    decode = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(jwt, "decode", counting_decode)
+    return calls
+
+
+def test_cache_hit_skips_signature_check(decodes):
+    cache = VerifiedTokenCache()
+    token = _token()
+    assert verify_token(token, SECRET, cache)["sub"] == "1"
+    assert verify_token(token, SECRET, cache)["sub"] == "1"
+    assert len(decodes) == 1
+
+
+def test_expired_entry_is_not_served(decodes):
+    cache = VerifiedTokenCache()
+    token = _token(ttl=1)
+    verify_token(token, SECRET, cache)
+    time.sleep(2.1)
+    assert cache.get(token) is None
+    with pytest.raises(jwt.ExpiredSignatureError):
+        verify_token(token, SECRET, cache)
+    assert len(decodes) == 2
+
+
+def test_only_the_exact_token_is_cached(decodes):
+    cache = VerifiedTokenCache()
+    token = _token()
+    verify_token(token, SECRET, cache)
+    # Andere Signatur, gleicher Payload: kein Treffer, die Prüfung schlägt fehl
+    forged = token[:-2] + ("AA" if not token.endswith("AA") else "BB")
+    with pytest.raises(jwt.InvalidTokenError):
+        verify_token(forged, SECRET, cache)
+    assert cache.get(forged) is None
+
+
+def test_tokens_without_exp_are_not_cached():
+    cache = VerifiedTokenCache()
+    token = jwt.encode({"sub": "1"}, SECRET, algorithm="HS256")
+    verify_token(token, SECRET, cache)
+    assert cache.get(token) is None
+
+
+def test_lru_keeps_max_entries():
+    cache = VerifiedTokenCache(max_entries=2)
+    tokens = [_token(n=n) for n in range(3)]
+    for token in tokens:
+        cache.put(token, {"sub": "1", "exp": time.time() + 60})
+    assert cache.get(tokens[0]) is None
+    assert cache.get(tokens[2]) is not None
+
+
+def _refresh_cookie(backend, client, user_id):
+    token, payload = backend.create_jwt(str(user_id), "refresh", backend.REFRESH_TTL)
+    backend.refresh_tokens.add(payload["jti"], user_id, payload["exp"])
+    client.set_cookie("refresh_token", token)
+    return token
+
+
+def test_refreshed_token_cannot_be_reused(backend, client, make_user):
+    user_id, _ = make_user()
+    old = _refresh_cookie(backend, client, user_id)
+
+    response = client.post("/refresh")
+    assert response.status_code == 200
+    new_access = response.get_json()["access_token"]
+    assert client.get("/streaks/stats", headers={"Authorization": f"Bearer {new_access}"}).status_code == 200
+
+    client.set_cookie("refresh_token", old)
+    assert client.post("/refresh").status_code == 401
+
+
+def test_revoked_token_cannot_refresh(backend, client, make_user):
+    user_id, _ = make_user()
+    token = _refresh_cookie(backend, client, user_id)
+    assert client.post("/logout").status_code == 200
+
+    client.set_cookie("refresh_token", token)
+    assert client.post("/refresh").status_code == 401
@@ -0,0 +1,96 @@
+"""ExerciseCache: frisch, stale-while-revalidate, Fallback, single-flight und LRU"""
+import threading
+import time
+
+import pytest
+
+from exercise_cache import ExerciseCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ExerciseCache(str(tmp_path / "exercise_cache.db"), ttl=60, stale_ttl=600, max_entries=3)
+
+
+class Loader:
+    """Zählt Aufrufe; liefert payload oder wirft error"""
+
+    def __init__(self, payload=None, error=None, delay=0.0):
+        self.payload = payload
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+        self.done = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        try:
+            time.sleep(self.delay)
+            if self.error is not None:
+                raise self.error
+            return self.payload
+        finally:
+            self.done.set()
+
+
+def test_fresh_hit_does_not_call_loader(cache):
+    cache.set("k", ["cached"])
+    loader = Loader(["new"])
+    assert cache.get_or_fetch("k", loader) == ["cached"]
+    assert loader.calls == 0
+
+
+def test_miss_loads_and_persists(cache, tmp_path):
+    loader = Loader(["loaded"])
+    assert cache.get_or_fetch("k", loader) == ["loaded"]
+    assert loader.calls == 1
+    # Zweite Instanz auf derselben Datei: Stufe 2 überlebt den Neustart
+    assert ExerciseCache(cache.path).get("k")[0] == ["loaded"]
+
+
+def test_stale_hit_returns_old_data_and_refreshes_in_background(cache):
+    cache.set("k", ["old"], fetched_at=time.time() - 120)
+    loader = Loader(["new"])
+    assert cache.get_or_fetch("k", loader) == ["old"]
+    assert loader.done.wait(5)
+
+    deadline = time.monotonic() + 5
+    while cache.get("k")[0] != ["new"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.get_or_fetch("k", Loader(["newer"])) == ["new"]
+    assert loader.calls == 1
+
+
+def test_loader_error_falls_back_to_expired_data(cache):
+    cache.set("k", ["ancient"], fetched_at=time.time() - 3600)
+    assert cache.get_or_fetch("k", Loader(error=RuntimeError("down"))) == ["ancient"]
+
+
+def test_loader_error_without_data_is_raised_and_not_cached(cache):
+    with pytest.raises(RuntimeError):
+        cache.get_or_fetch("k", Loader(error=RuntimeError("down")))
+    assert cache.get("k") is None
+
+
+def test_concurrent_misses_share_one_loader_call(cache):
+    loader = Loader(["shared"], delay=0.2)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("k", loader)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loader.calls == 1
+    assert results == [["shared"]] * 8
+
+
+def test_lru_evicts_least_recently_used(cache):
+    for key in ("a", "b", "c"):
+        cache.set(key, [key])
+    cache.get("a")
+    cache.set("d", ["d"])
+    assert list(cache._lru) == ["c", "a", "d"]
+    # Aus dem LRU verdrängt heißt nicht verloren - SQLite hat den Eintrag noch
+    assert cache.get("b") == (["b"], pytest.approx(time.time(), abs=60))
+    assert "b" in cache._lru and len(cache._lru) == 3
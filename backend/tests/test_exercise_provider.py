@@ -0,0 +1,139 @@
+"""ExerciseProviderClient gegen einen lokalen Stub-Server statt API Ninjas"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from exercise_provider import AsyncExerciseProviderClient, ExerciseProviderClient, ProviderError
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Verhalten über den muscle-Parameter: ok, flaky (erst 503), garbage, bad, slow
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        muscle = query.get("muscle", ["ok"])[0]
+        self.server.calls.append((muscle, self.headers.get("X-Api-Key")))
+        attempts = sum(1 for called, _ in self.server.calls if called == muscle)
+
+        if muscle == "slow":
+            time.sleep(2)
+        if muscle == "bad":
+            return self._send(400, b'{"error": "invalid muscle"}')
+        if muscle == "flaky" and attempts < 3:
+            return self._send(503, b"busy")
+        if muscle == "garbage":
+            return self._send(200, b"<html>not json</html>")
+        self._send(200, json.dumps([{"name": f"{muscle} exercise", "muscle": muscle}]).encode())
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except OSError:
+            pass  # Client hat wegen Timeout schon aufgelegt
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.calls = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(stub_server):
+    outcomes = []
+    client = ExerciseProviderClient(
+        "test-key", url=f"http://127.0.0.1:{stub_server.server_port}/v1/exercises",
+        timeout=1, deadline=5, max_retries=3, backoff_base=0.01, backoff_max=0.05,
+        observer=lambda seconds, outcome: outcomes.append(outcome),
+    )
+    client.outcomes = outcomes
+    yield client
+    client.close()
+
+
+def test_fetch_sends_params_and_api_key(client, stub_server):
+    assert client.fetch_exercises(muscle="biceps") == [{"name": "biceps exercise", "muscle": "biceps"}]
+    assert stub_server.calls == [("biceps", "test-key")]
+    assert client.outcomes == ["200"]
+
+
+def test_retries_retryable_status(client, stub_server):
+    assert client.fetch_exercises(muscle="flaky")[0]["muscle"] == "flaky"
+    assert client.outcomes == ["503", "503", "200"]
+
+
+def test_client_error_is_not_retried(client, stub_server):
+    with pytest.raises(ProviderError) as error:
+        client.fetch_exercises(muscle="bad")
+    assert error.value.status_code == 400
+    assert len(stub_server.calls) == 1
+
+
+def test_invalid_json_becomes_provider_error(client):
+    with pytest.raises(ProviderError, match="Ungültige Antwort"):
+        client.fetch_exercises(muscle="garbage")
+
+
+def test_deadline_covers_all_attempts(client):
+    started = time.monotonic()
+    with pytest.raises(ProviderError):
+        client.get_json({"muscle": "slow"}, deadline=1.5)
+    # Ohne Deadline: 4 Versuche à 1 s Timeout plus Backoff
+    assert time.monotonic() - started < 2.5
+
+
+def test_connection_error_becomes_provider_error():
+    client = ExerciseProviderClient("key", url="http://127.0.0.1:9/v1/exercises", timeout=0.5,
+                                    deadline=2, max_retries=1, backoff_base=0.01)
+    with pytest.raises(ProviderError, match="nicht erreichbar"):
+        client.fetch_exercises(muscle="biceps")
+
+
+def test_fetch_many_isolates_failures(client):
+    results = client.fetch_many([{"muscle": "biceps"}, {"muscle": "garbage"}, {"muscle": "bad"}])
+    assert [combination["muscle"] for combination, _, _ in results] == ["biceps", "garbage", "bad"]
+    assert results[0][1] == [{"name": "biceps exercise", "muscle": "biceps"}]
+    assert results[0][2] is None
+    assert all(exercises is None and isinstance(error, ProviderError) for _, exercises, error in results[1:])
+
+
+def _fetch_async(stub_server, muscle):
+    """Einmal AsyncExerciseProviderClient.fetch_exercises in einem eigenen Event Loop"""
+    pytest.importorskip("httpx")
+
+    async def fetch():
+        client = AsyncExerciseProviderClient(
+            "test-key", url=f"http://127.0.0.1:{stub_server.server_port}/v1/exercises",
+            timeout=1, deadline=5, max_retries=3, backoff_base=0.01, backoff_max=0.05)
+        try:
+            return await client.fetch_exercises(muscle=muscle)
+        finally:
+            await client.aclose()
+    return asyncio.run(fetch())
+
+
+def test_async_fetch_retries_and_returns_json(stub_server):
+    assert _fetch_async(stub_server, "flaky")[0]["muscle"] == "flaky"
+    assert len(stub_server.calls) == 3
+
+
+def test_async_invalid_json_becomes_provider_error(stub_server):
+    with pytest.raises(ProviderError, match="Ungültige Antwort") as error:
+        _fetch_async(stub_server, "garbage")
+    assert error.value.status_code == 200
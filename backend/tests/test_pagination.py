@@ -0,0 +1,40 @@
+"""Keyset-Pagination von GET /workouts und GET /user/<id>/workouts"""
+
+
+def test_workouts_pages_cover_everything_once(client, make_workouts):
+    make_workouts(12)
+    everything = [workout["id"] for workout in client.get("/workouts").get_json()]
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 5, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/workouts", query_string=params).get_json()
+        pages += 1
+        assert len(page["workouts"]) <= 5
+        seen.extend(workout["id"] for workout in page["workouts"])
+        cursor = page["next_cursor"]
+        assert page["has_more"] is (cursor is not None)
+        if cursor is None:
+            break
+        assert pages < 100
+
+    assert seen == sorted(everything)
+    assert len(seen) == len(set(seen))
+    assert len(page["workouts"]) > 0
+
+
+def test_workouts_limit_zero_is_clamped_to_one(client, make_workouts):
+    make_workouts(2)
+    page = client.get("/workouts", query_string={"limit": 0}).get_json()
+    assert page["limit"] == 1
+    assert len(page["workouts"]) == 1
+    assert page["has_more"] is True
+
+
+def test_user_workouts_limit_zero_is_clamped_to_one(client, make_user, make_workouts):
+    user_id, _ = make_user()
+    client.post("/workouts/subscribe/batch", json={"user_id": user_id, "workout_ids": make_workouts(2)})
+    page = client.get(f"/user/{user_id}/workouts", query_string={"limit": 0}).get_json()
+    assert page["limit"] == 1
+    assert page["count"] == 1
+    assert page["next_cursor"] is not None
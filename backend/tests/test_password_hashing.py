@@ -0,0 +1,28 @@
+import pytest
+
+from password_hashing import PasswordHasher
+
+
+@pytest.mark.parametrize("method", ["scrypt", "pbkdf2", "pbkdf2:sha256"])
+def test_fresh_hash_needs_no_rehash(method):
+    hasher = PasswordHasher(method, workers=0)
+    pwhash = hasher.hash("correct horse")
+    assert not hasher.needs_rehash(pwhash)
+    assert hasher.verify(pwhash, "correct horse") == (True, None)
+
+
+def test_changed_parameters_trigger_rehash():
+    old = PasswordHasher("pbkdf2:sha256", salt_length=8, workers=0)
+    new = PasswordHasher("scrypt", salt_length=16, workers=0)
+    pwhash = old.hash("correct horse")
+
+    valid, new_hash = new.verify(pwhash, "correct horse")
+    assert valid
+    assert new_hash.startswith("scrypt:")
+    assert not new.needs_rehash(new_hash)
+    assert PasswordHasher("pbkdf2:sha256", salt_length=16, workers=0).needs_rehash(pwhash)
+
+
+def test_wrong_password_is_rejected():
+    hasher = PasswordHasher("scrypt", workers=0)
+    assert hasher.verify(hasher.hash("correct horse"), "wrong") == (False, None)
@@ -0,0 +1,39 @@
+"""Hot-Path-Abfragen müssen nach den Migrationen ihre Indizes nutzen (EXPLAIN QUERY PLAN)"""
+import re
+
+
+def test_hot_path_queries_use_indexes(backend):
+    with backend.app.app_context():
+        failures = backend.check_query_plans()
+    assert failures == []
+
+
+def test_every_check_expects_an_index(backend):
+    with backend.app.app_context():
+        checks = backend.query_plan_checks()
+    assert checks
+    assert all(indexes for _, _, indexes in checks)
+
+
+def _shape(sql):
+    """SQL ohne Spalten-Labels - die ORM-Ausführung benennt Spalten anders als ein nacktes compile()"""
+    return re.sub(r" AS \w+", "", sql)
+
+
+def _sql(backend, query):
+    statement = getattr(query, "statement", query)
+    return _shape(str(statement.compile(backend.db.engine)))
+
+
+def test_checked_queries_are_the_ones_the_routes_run(backend, client, make_user, make_workouts, statement_counter):
+    user_id, headers = make_user()
+    client.post("/workouts/subscribe/batch", json={"user_id": user_id, "workout_ids": make_workouts(1)})
+    with backend.app.app_context():
+        checks = {name: _sql(backend, query) for name, query, _ in backend.query_plan_checks(user_id)}
+
+    with statement_counter() as statements:
+        client.get("/streaks", headers=headers)
+        client.get("/streaks/activity", headers=headers)
+        client.get(f"/user/{user_id}/workouts", query_string={"limit": 50})
+    for name in ("GET /streaks", "GET /streaks/activity", "GET /user/<id>/workouts"):
+        assert checks[name] in [_shape(statement) for statement in statements], name
@@ -0,0 +1,90 @@
+"""Refresh-Token-Stores: Rotation, Wiederverwendung, Widerruf, Ablauf und Sweeper - beide Backends"""
+import time
+
+import pytest
+
+from refresh_tokens import RefreshTokenStore, create_store
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    return create_store(request.param, str(tmp_path / "refresh_tokens.db"))
+
+
+def _in(seconds):
+    return time.time() + seconds
+
+
+def test_interface_cannot_be_instantiated():
+    with pytest.raises(TypeError):
+        RefreshTokenStore()
+
+
+def test_rotate_replaces_the_old_jti(store):
+    store.add("a", 1, _in(60))
+    assert store.rotate("a", 1, "b", _in(60))
+    assert store.rotate("b", "1", "c", _in(60))
+
+
+def test_reuse_after_rotate_fails(store):
+    store.add("a", 1, _in(60))
+    assert store.rotate("a", 1, "b", _in(60))
+    assert not store.rotate("a", 1, "x", _in(60))
+    # Der Fehlversuch lässt das aktuelle Token unberührt
+    assert store.rotate("b", 1, "c", _in(60))
+
+
+def test_rotate_checks_the_owner(store):
+    store.add("a", 1, _in(60))
+    assert not store.rotate("a", 2, "b", _in(60))
+    assert store.rotate("a", 1, "b", _in(60))
+
+
+def test_revoke_and_revoke_user(store):
+    store.add("a", 1, _in(60))
+    store.add("b", 1, _in(60))
+    store.add("c", 2, _in(60))
+    store.revoke("a")
+    assert not store.rotate("a", 1, "x", _in(60))
+
+    assert store.revoke_user(1) == 1
+    assert not store.rotate("b", 1, "x", _in(60))
+    assert store.rotate("c", 2, "d", _in(60))
+
+
+def test_expired_token_cannot_be_rotated_and_is_swept(store):
+    store.add("old", 1, _in(-1))
+    store.add("older", 1, _in(-5))
+    store.add("live", 1, _in(60))
+    assert not store.rotate("old", 1, "x", _in(60))
+
+    assert store.sweep(batch_size=1) == 2
+    assert store.sweep() == 0
+    assert store.rotate("live", 1, "next", _in(60))
+
+
+def test_sweep_respects_now(store):
+    store.add("a", 1, 100)
+    store.add("b", 1, 200)
+    assert store.sweep(now=150) == 1
+    assert store.sweep(now=250) == 1
+
+
+def test_sweeper_removes_expired_tokens_in_background(store):
+    store.add("expired", 1, _in(-1))
+    store.add("live", 1, _in(60))
+    swept = []
+    sweep = store.sweep
+
+    def recording_sweep(batch_size=1000, now=None):
+        swept.append(sweep(batch_size, now))
+        return swept[-1]
+
+    store.sweep = recording_sweep
+
+    store.start_sweeper(interval=0.02, batch_size=10)
+    deadline = time.monotonic() + 5
+    while not swept and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert swept[0] == 1
+    assert store.rotate("live", 1, "next", _in(60))
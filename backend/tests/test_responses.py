@@ -0,0 +1,49 @@
+"""FastJSONProvider liefert in jedem Modus dasselbe JSON wie der Flask-Standard"""
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from uuid import UUID
+
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from responses import FastJSONProvider
+
+PAYLOAD = {
+    "day": date(2026, 10, 17),
+    "at": datetime(2026, 10, 17, 7, 30, tzinfo=timezone.utc),
+    "naive": datetime(2026, 10, 17, 7, 30),
+    "id": UUID("12345678-1234-5678-1234-567812345678"),
+    "amount": Decimal("1.50"),
+    "name": "Übung",
+    "nested": [{"b": 2, "a": 1}],
+}
+
+
+def _app(debug=False):
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.debug = debug
+    return app
+
+
+def _reference():
+    app = Flask(__name__)
+    return json.loads(DefaultJSONProvider(app).dumps(PAYLOAD))
+
+
+@pytest.mark.parametrize("debug", [False, True], ids=["compact", "debug"])
+def test_response_matches_flask_default(debug):
+    app = _app(debug)
+    with app.app_context():
+        body = json.loads(app.json.response(PAYLOAD).get_data())
+    assert body == _reference()
+    assert body["day"] == "Sat, 17 Oct 2026 00:00:00 GMT"
+    assert body["at"] == "Sat, 17 Oct 2026 07:30:00 GMT"
+
+
+def test_dumps_matches_flask_default():
+    app = _app()
+    assert json.loads(app.json.dumps(PAYLOAD)) == _reference()
+    assert list(json.loads(app.json.dumps({"b": 1, "a": 2}))) == ["a", "b"]
@@ -0,0 +1,91 @@
+"""Volltextsuche: FTS5-Ranking, Trigger-Synchronisation und der LIKE-Fallback ohne FTS"""
+import uuid
+
+import pytest
+import sqlalchemy as sa
+
+
+def _token():
+    return f"zq{uuid.uuid4().hex[:10]}"
+
+
+@pytest.fixture
+def add_workout(backend):
+    def add(name, description="", category="Kraft"):
+        with backend.app.app_context():
+            workout = backend.Workout(name=name, description=description, duration=20,
+                                      difficulty="Anfänger", category=category)
+            backend.db.session.add(workout)
+            backend.db.session.commit()
+            return workout.id
+    return add
+
+
+def _search(client, q, **params):
+    response = client.get("/workouts/search", query_string={"q": q, **params})
+    assert response.status_code == 200
+    return [workout["id"] for workout in response.get_json()["workouts"]]
+
+
+@pytest.fixture
+def fts(backend):
+    with backend.app.app_context():
+        if backend.db.engine.dialect.name != "sqlite":
+            pytest.skip("FTS5 gibt es nur unter SQLite")
+
+
+def test_bm25_ranks_name_over_category_over_description(fts, client, add_workout):
+    token = _token()
+    in_description = add_workout("Plank", description=f"Core {token} Stabilität")
+    in_name = add_workout(f"{token} Press")
+    in_category = add_workout("Row", category=token)
+
+    assert _search(client, token) == [in_name, in_category, in_description]
+    # Das letzte Wort gilt als Präfix
+    assert _search(client, token[:-3]) == [in_name, in_category, in_description]
+
+
+def test_triggers_keep_index_in_sync(fts, backend, client, add_workout):
+    old, new = _token(), _token()
+    workout_id = add_workout(f"{old} Squat")
+    assert _search(client, old) == [workout_id]
+
+    with backend.app.app_context():
+        backend.db.session.execute(sa.update(backend.Workout).where(backend.Workout.id == workout_id)
+                                   .values(name=f"{new} Squat"))
+        backend.db.session.commit()
+    assert _search(client, old) == []
+    assert _search(client, new) == [workout_id]
+
+    with backend.app.app_context():
+        backend.db.session.execute(sa.delete(backend.Workout).where(backend.Workout.id == workout_id))
+        backend.db.session.commit()
+    assert _search(client, new) == []
+
+
+def test_like_fallback_matches_every_word(backend, add_workout):
+    first, second = _token(), _token()
+    both = add_workout(f"{first} Curl", description=f"mit {second}")
+    only_first = add_workout(f"{first} Dip")
+
+    with backend.app.app_context():
+        def ids(text):
+            return [workout.id for workout in backend.db.session.scalars(backend.like_search_query(text))]
+
+        assert ids(first.upper()) == [both, only_first]
+        assert ids(f"{first} {second}") == [both]
+
+
+def test_like_fallback_escapes_wildcards(backend, add_workout):
+    token = _token()
+    underscored = add_workout(f"{token}_x Lunge")
+    add_workout(f"{token}ax Lunge")
+
+    with backend.app.app_context():
+        def ids(text):
+            return [workout.id for workout in backend.db.session.scalars(backend.like_search_query(text))]
+
+        assert ids(f"{token}_x") == [underscored]
+        # "_" allein darf nicht als Platzhalter jede Zeile treffen
+        assert underscored in ids("_")
+        assert len(ids("_")) < backend.db.session.scalar(sa.select(sa.func.count()).select_from(backend.Workout))
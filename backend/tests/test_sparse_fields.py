@@ -0,0 +1,41 @@
+"""?fields= lädt nur die angefragten Workout-Spalten"""
+
+
+def _user_with_subscriptions(client, make_user, make_workouts):
+    user_id, _ = make_user()
+    workout_ids = make_workouts(3)
+    client.post("/workouts/subscribe/batch", json={"user_id": user_id, "workout_ids": workout_ids})
+    return user_id
+
+
+def test_user_workouts_fields_skip_unrequested_columns(client, make_user, make_workouts, statement_counter):
+    user_id = _user_with_subscriptions(client, make_user, make_workouts)
+
+    with statement_counter() as statements:
+        response = client.get(f"/user/{user_id}/workouts", query_string={"fields": "name,progress"})
+    assert response.status_code == 200
+    workouts = response.get_json()["workouts"]
+    assert len(workouts) == 3
+    assert all(set(workout) == {"name", "progress"} for workout in workouts)
+    assert len(statements) == 1
+    assert "description" not in statements[0]
+
+
+def test_user_workouts_fields_without_workout_columns(client, make_user, make_workouts, statement_counter):
+    user_id = _user_with_subscriptions(client, make_user, make_workouts)
+
+    with statement_counter() as statements:
+        response = client.get(f"/user/{user_id}/workouts", query_string={"fields": "is_favorite", "limit": 2})
+    body = response.get_json()
+    assert body["workouts"] == [{"is_favorite": False}] * 2
+    assert body["has_more"] is True
+    assert len(statements) == 1
+    assert "workouts.name" not in statements[0]
+
+
+def test_user_workouts_without_fields_returns_everything(client, make_user, make_workouts):
+    user_id = _user_with_subscriptions(client, make_user, make_workouts)
+
+    workouts = client.get(f"/user/{user_id}/workouts").get_json()["workouts"]
+    assert set(workouts[0]) == {"id", "name", "description", "duration", "difficulty", "category",
+                                "is_favorite", "progress", "subscribed_at"}
@@ -0,0 +1,20 @@
+"""SQL-Zählung und -Zeitmessung pro Request"""
+import pytest
+import sqlalchemy as sa
+from flask import g
+
+
+def test_failed_statement_does_not_skew_later_timings(backend):
+    with backend.app.test_request_context("/"):
+        g.sql_statements = 0
+        g.sql_seconds = 0.0
+        with backend.db.engine.connect() as conn:
+            with pytest.raises(sa.exc.DBAPIError):
+                conn.execute(sa.text("SELECT * FROM no_such_table"))
+            conn.rollback()
+            assert conn.execute(sa.text("SELECT 1")).scalar() == 1
+            assert "query_started" not in conn.info
+
+        # Nur das erfolgreiche Statement zählt, gemessen ab seinem eigenen Start
+        assert g.sql_statements == 1
+        assert 0 <= g.sql_seconds < 1
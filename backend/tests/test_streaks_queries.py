@@ -0,0 +1,32 @@
+"""GET /streaks darf nicht mit der Zahl geloggter Workouts mehr SQL absetzen"""
+
+
+def _user_with_logged_workouts(client, make_user, make_workouts, n):
+    user_id, headers = make_user()
+    workout_ids = make_workouts(n)
+    response = client.post("/workouts/subscribe/batch", json={"user_id": user_id, "workout_ids": workout_ids})
+    assert response.status_code == 200
+    for workout_id in workout_ids:
+        response = client.post("/streaks", json={"workout_id": workout_id}, headers=headers)
+        assert response.status_code == 201
+    return headers
+
+
+def _statements_for_get_streaks(client, statement_counter, headers):
+    with statement_counter() as statements:
+        response = client.get("/streaks", headers=headers)
+    assert response.status_code == 200
+    return response.get_json(), len(statements)
+
+
+def test_get_streaks_statement_count_is_constant(client, make_user, make_workouts, statement_counter):
+    one = _user_with_logged_workouts(client, make_user, make_workouts, 1)
+    many = _user_with_logged_workouts(client, make_user, make_workouts, 12)
+
+    body_one, statements_one = _statements_for_get_streaks(client, statement_counter, one)
+    body_many, statements_many = _statements_for_get_streaks(client, statement_counter, many)
+
+    assert len(body_one["workouts"]) == 1
+    assert len(body_many["workouts"]) == 12
+    assert all(workout["current_streak"] == 1 for workout in body_many["workouts"])
+    assert statements_one == statements_many == 3
@@ -0,0 +1,57 @@
+"""POST /streaks und POST /streaks/batch behandeln nicht abonnierte Workouts gleich"""
+from datetime import date
+
+
+def _logged_count(client, headers):
+    return client.get("/streaks/stats", headers=headers).get_json()["stats"]["total_workouts_logged"]
+
+
+def test_unsubscribed_workouts_are_not_logged_by_either_endpoint(client, make_user, make_workouts):
+    user_id, headers = make_user()
+    subscribed, unsubscribed = make_workouts(2)
+    client.post("/workouts/subscribe/batch", json={"user_id": user_id, "workout_ids": [subscribed]})
+
+    single = client.post("/streaks", json={"workout_id": unsubscribed}, headers=headers)
+    assert single.get_json()["subscribe_recommended"] is True
+    assert _logged_count(client, headers) == 0
+
+    timestamp = f"{date.today().isoformat()}T08:00:00"
+    batch = client.post("/streaks/batch", headers=headers, json={"entries": [
+        {"workout_id": unsubscribed, "timestamp": timestamp},
+        {"workout_id": subscribed, "timestamp": timestamp},
+    ]})
+    assert batch.status_code == 201
+    body = batch.get_json()
+    assert body["created"] == 1
+    assert body["rejected"] == [{"index": 0, "error": "Workout nicht abonniert"}]
+    assert body["not_subscribed"] == [unsubscribed]
+    assert _logged_count(client, headers) == 1
+
+
+def test_repeated_rejected_entries_are_rejected_not_duplicates(client, make_user, make_workouts):
+    user_id, headers = make_user()
+    subscribed, unsubscribed = make_workouts(2)
+    client.post("/workouts/subscribe/batch", json={"user_id": user_id, "workout_ids": [subscribed]})
+
+    day = date.today().isoformat()
+    batch = client.post("/streaks/batch", headers=headers, json={"entries": [
+        {"workout_id": unsubscribed, "timestamp": f"{day}T08:00:00"},
+        {"workout_id": unsubscribed, "timestamp": f"{day}T09:00:00"},
+        {"workout_id": 10 ** 9, "timestamp": f"{day}T08:00:00"},
+        {"workout_id": 10 ** 9, "timestamp": f"{day}T09:00:00"},
+        {"workout_id": subscribed, "timestamp": f"{day}T10:00:00"},
+        {"workout_id": subscribed, "timestamp": f"{day}T07:00:00"},
+        {"workout_id": subscribed, "timestamp": "gestern"},
+    ]})
+    body = batch.get_json()
+    assert body["created"] == 1
+    assert body["rejected"] == [
+        {"index": 0, "error": "Workout nicht abonniert"},
+        {"index": 1, "error": "Workout nicht abonniert"},
+        {"index": 2, "error": "Workout nicht gefunden"},
+        {"index": 3, "error": "Workout nicht gefunden"},
+        {"index": 6, "error": "timestamp muss ISO 8601 sein"},
+    ]
+    # Der frühere Eintrag (Index 5) gewinnt, der spätere ist das Duplikat
+    assert body["duplicates"] == [4]
+    assert body["not_subscribed"] == [unsubscribed]
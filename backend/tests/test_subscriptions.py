@@ -0,0 +1,43 @@
+"""POST /workouts/subscribe und /workouts/unsubscribe: Validierung und parallele Abos"""
+import pytest
+
+
+@pytest.mark.parametrize("ids", [
+    {"user_id": "abc", "workout_id": 1},
+    {"user_id": 1, "workout_id": "1x"},
+    {"user_id": 1, "workout_id": [1]},
+])
+@pytest.mark.parametrize("route", ["/workouts/subscribe", "/workouts/unsubscribe"])
+def test_non_integer_ids_are_rejected(client, route, ids):
+    response = client.post(route, json=ids)
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "IDs müssen Zahlen sein"
+
+
+def test_unsubscribe_accepts_numeric_strings(client, make_user, make_workouts):
+    user_id, _ = make_user()
+    workout_id = make_workouts(1)[0]
+    client.post("/workouts/subscribe", json={"user_id": user_id, "workout_id": workout_id})
+
+    response = client.post("/workouts/unsubscribe", json={"user_id": str(user_id), "workout_id": str(workout_id)})
+    assert response.status_code == 200
+    assert response.get_json() == {"success": True, "message": "Erfolgreich deabonniert"}
+    response = client.post("/workouts/unsubscribe", json={"user_id": user_id, "workout_id": workout_id})
+    assert response.get_json() == {"success": False, "message": "Workout nicht abonniert"}
+
+
+def test_concurrent_duplicate_subscribe_is_reported_as_already_subscribed(backend, client, make_user,
+                                                                         make_workouts, monkeypatch):
+    user_id, _ = make_user()
+    workout_id = make_workouts(1)[0]
+    assert client.post("/workouts/subscribe", json={"user_id": user_id, "workout_id": workout_id}).status_code == 200
+
+    # Wie ein zweiter Request, dessen Prüfung vor dem INSERT des ersten lief
+    monkeypatch.setattr(backend.WorkoutService, "is_subscribed", staticmethod(lambda user_id, workout_id: False))
+    response = client.post("/workouts/subscribe", json={"user_id": user_id, "workout_id": workout_id})
+    assert response.status_code == 400
+    assert response.get_json() == {"success": False, "message": "Workout bereits abonniert"}
+
+    with backend.app.app_context():
+        assert backend.WorkoutService.subscribe_user_to_workout(user_id, workout_id) == (
+            False, "Workout bereits abonniert")
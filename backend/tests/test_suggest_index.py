@@ -0,0 +1,47 @@
+"""Vorberechnete Top-Listen des Typeahead-Index"""
+from suggest_index import PrefixIndex
+
+WORKOUTS = [
+    (1, "Bench Press", 5),
+    (2, "Bent Over Row", 9),
+    (3, "Push-Up", 2),
+    (4, "Barbell Curl", 0),
+]
+
+
+def _index(**options):
+    index = PrefixIndex(**options)
+    index.rebuild(WORKOUTS, ["Bulgarian Split Squat"])
+    return index
+
+
+def _names(suggestions):
+    return [suggestion["name"] for suggestion in suggestions]
+
+
+def test_short_prefixes_are_precomputed_on_rebuild():
+    index = _index()
+    assert {"b", "be", "ba", "bu", "p", "pr", "pu", "r", "ro", "o", "ov"} <= set(index._top)
+    assert not any(len(prefix) > 2 or prefix.endswith(" ") for prefix in index._top)
+    assert index._top["be"] == ["bent over row", "bench press"]
+    assert _names(index.suggest("B", limit=2)) == ["Bent Over Row", "Bench Press"]
+
+
+def test_precomputed_prefixes_follow_subscriber_changes():
+    index = _index()
+    index.adjust_subscribers(4, 10)
+    assert _names(index.suggest("ba")) == ["Barbell Curl"]
+    assert _names(index.suggest("b", limit=1)) == ["Barbell Curl"]
+
+    index.adjust_subscribers(4, -10)
+    assert _names(index.suggest("b", limit=1)) == ["Bent Over Row"]
+    assert "b" in index._top
+
+
+def test_precomputed_prefixes_are_not_evicted():
+    index = _index(cache_threshold=0, cache_size=1)
+    warm = set(index._top)
+    for prefix in ("ben", "bent", "bench", "pus"):
+        index.suggest(prefix)
+    assert warm <= set(index._top)
+    assert len(set(index._top) - warm) <= 1